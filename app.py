@@ -1,15 +1,18 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import os
 import time
+import hashlib
 from typing import Tuple # 确保 typing 被导入
 
 # 导入我们所有的自定义模块
 try:
     from radar_sei_system.data_management import load_iq_data
-    from radar_sei_system.feature_extraction import extract_features
+    from radar_sei_system.feature_extraction import extract_features, FeatureMatrix
     from radar_sei_system.ml_modeling import train, predict
     from radar_sei_system.performance_evaluation import evaluate
+    from radar_sei_system.visualizatoin_interaction import CACHE_SUFFIX, build_pyramid, get_pyramid_info, get_envelope_view, get_spectrogram_view
 except ImportError as e:
     st.error(f"启动失败：无法导入核心模块。请检查 __init__.py 文件是否配置正确。")
     st.error(f"详细错误: {e}")
@@ -33,6 +36,12 @@ TEMP_DIR = "./temp_uploads"
 if not os.path.exists(TEMP_DIR):
     os.makedirs(TEMP_DIR)
 
+# 信号浏览页保留的文件 (连同多分辨率缓存) 放在单独的子目录，总大小超过上限时删除最久未使用的
+BROWSE_DIR = os.path.join(TEMP_DIR, "browse")
+BROWSE_DIR_MAX_BYTES = 2 * 1024 ** 3
+if not os.path.exists(BROWSE_DIR):
+    os.makedirs(BROWSE_DIR)
+
 # --- 2. 辅助函数 ---
 def save_uploaded_file(uploaded_file):
     """保存上传的文件到临时目录，返回文件路径"""
@@ -46,9 +55,58 @@ def cleanup_temp_file(file_path):
     if os.path.exists(file_path):
         os.remove(file_path)
 
+def cleanup_browse_file(file_path):
+    """删除信号浏览页保存的文件及其多分辨率缓存"""
+    cleanup_temp_file(file_path)
+    cleanup_temp_file(file_path + CACHE_SUFFIX)
+
+def save_browse_file(uploaded_file):
+    """
+    保存信号浏览页上传的文件，返回文件路径。
+    文件名带内容哈希，同名但内容不同的文件不会复用旧文件和旧缓存。
+    同一次上传只计算一次哈希 (拖动滑块时 Streamlit 会反复重新运行脚本)。
+    """
+    upload_key = (getattr(uploaded_file, "file_id", uploaded_file.name), uploaded_file.size)
+    saved = st.session_state.get("browse_file")
+    if saved and saved[0] == upload_key and os.path.exists(saved[1]):
+        os.utime(saved[1])
+        return saved[1]
+
+    buffer = uploaded_file.getbuffer()
+    digest = hashlib.sha1(buffer).hexdigest()[:16]
+    file_path = os.path.join(BROWSE_DIR, f"{digest}_{uploaded_file.name}")
+    if os.path.exists(file_path):
+        os.utime(file_path)
+    else:
+        with open(file_path, "wb") as f:
+            f.write(buffer)
+    st.session_state["browse_file"] = (upload_key, file_path)
+    evict_browse_files(keep=file_path)
+    return file_path
+
+def evict_browse_files(keep=None):
+    """浏览目录总大小超过 BROWSE_DIR_MAX_BYTES 时，按最近使用时间从旧到新删除 (不删除 keep)"""
+    entries = []
+    for name in os.listdir(BROWSE_DIR):
+        path = os.path.join(BROWSE_DIR, name)
+        if name.endswith(CACHE_SUFFIX) or not os.path.isfile(path):
+            continue
+        size = os.path.getsize(path)
+        if os.path.exists(path + CACHE_SUFFIX):
+            size += os.path.getsize(path + CACHE_SUFFIX)
+        entries.append((os.path.getmtime(path), size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= BROWSE_DIR_MAX_BYTES:
+            break
+        if path != keep:
+            cleanup_browse_file(path)
+            total -= size
+
 # --- 3. 页面导航 (侧边栏) ---
 st.sidebar.title("导航")
-page = st.sidebar.radio("选择功能", ["🎯 预测 (Prediction)", "🏋️ 训练 (Training)"])
+page = st.sidebar.radio("选择功能", ["🎯 预测 (Prediction)", "🏋️ 训练 (Training)", "📈 信号浏览 (Visualization)"])
 
 # ==============================================================================
 # --- 页面一：预测 ---
@@ -107,7 +165,7 @@ if page == "🎯 预测 (Prediction)":
                     if feature_obj.empty:
                         st.error("特征提取失败！")
                         st.stop()
-                    st.dataframe(feature_obj)
+                    st.dataframe(feature_obj.to_dataframe())
 
                     # 步骤 D: 执行预测
                     st.subheader("C. 预测结果")
@@ -166,8 +224,8 @@ elif page == "🏋️ 训练 (Training)":
                 st.error("训练至少需要2个文件。")
                 st.stop()
 
-            all_features_list = []
-            all_labels = []
+            # 所有文件的特征直接写入同一个预分配的特征矩阵，标签随行保存
+            training_features = FeatureMatrix.from_methods(feature_options, capacity=len(uploaded_files))
             temp_files_to_clean = []
             
             with st.spinner(f'正在处理 {len(uploaded_files)} 个文件... VMD可能很慢...'):
@@ -193,14 +251,11 @@ elif page == "🏋️ 训练 (Training)":
                             st.warning(f"文件 {file.name} 内部未找到有效标签，已跳过。")
                             continue
                             
-                        # 步骤 D: 提取特征 (使用选择的特征)
-                        feature_obj = extract_features(data_obj, methods=feature_options)
+                        # 步骤 D: 提取特征 (使用选择的特征)，成功时追加一行 (特征 + 标签)
+                        feature_obj = extract_features(data_obj, methods=feature_options, out=training_features)
                         if feature_obj.empty:
                             st.warning(f"提取 {file.name} 特征失败，已跳过。")
                             continue
-                            
-                        all_features_list.append(feature_obj)
-                        all_labels.append(label)
                         
                     except Exception as e:
                         st.warning(f"处理 {file.name} 时出错: {e}，已跳过。")
@@ -209,14 +264,14 @@ elif page == "🏋️ 训练 (Training)":
                 
                 status_text.text("所有文件处理完毕！")
 
-            # 步骤 E: 合并所有特征
-            if not all_features_list:
+            # 步骤 E: 检查特征矩阵
+            if training_features.empty:
                 st.error("没有文件被成功处理！请检查文件格式和内容。")
                 st.stop()
                 
-            training_features = pd.concat(all_features_list, ignore_index=True)
+            all_labels = training_features.labels.tolist()
             st.subheader("提取的特征总览 (前5行):")
-            st.dataframe(training_features.head())
+            st.dataframe(training_features.to_dataframe().head())
             
             label_counts = pd.Series(all_labels).value_counts()
             st.write(f"总共提取了 {len(all_labels)} 个样本。")
@@ -255,4 +310,83 @@ elif page == "🏋️ 训练 (Training)":
             # 步骤 H: 清理所有临时文件
             for path in temp_files_to_clean:
                 cleanup_temp_file(path)
-            st.info("临时文件已清理。")
\ No newline at end of file
+            st.info("临时文件已清理。")
+
+# ==============================================================================
+# --- 页面三：信号浏览 ---
+# ==============================================================================
+elif page == "📈 信号浏览 (Visualization)":
+    st.header("📈 信号波形与语谱图浏览")
+    st.info("""
+    **提示:**
+    1.  首次打开某个文件时会完整扫描一遍，生成多分辨率缓存 (与文件放在同一目录)。
+    2.  之后的缩放/平移只读取当前视窗需要的数据块，绘图点数由图宽决定，与信号长度无关。
+    """)
+
+    uploaded_file = st.file_uploader("上传一个 .h5 文件进行浏览", type=["h5"])
+
+    if uploaded_file is None and "browse_file" in st.session_state:
+        # 用户清空了上传框：删除上次保存的文件和缓存
+        cleanup_browse_file(st.session_state.pop("browse_file")[1])
+
+    if uploaded_file is not None:
+        # 每次拖动滑块 Streamlit 都会重新运行脚本，文件和缓存需要保留，不在这里清理
+        file_path = save_browse_file(uploaded_file)
+
+        with st.spinner("正在构建多分辨率缓存 (仅首次)..."):
+            cache_path = build_pyramid(file_path)
+        if not cache_path:
+            st.error("多分辨率缓存构建失败！请检查文件格式。")
+            st.stop()
+
+        info = get_pyramid_info(file_path)
+        if info is None:
+            st.error("读取信号失败！")
+            st.stop()
+        n_samples = info["n_samples"]
+        if n_samples == 0:
+            st.warning("信号为空，没有可浏览的数据。")
+            st.stop()
+        fs = info["sampling_rate"]
+        duration_ms = n_samples / fs * 1e3
+
+        st.write(f"信号长度: {n_samples}, 采样率: {fs/1e6} MHz, 时长: {duration_ms:.3f} ms")
+
+        col1, col2 = st.columns(2)
+        with col1:
+            width_px = st.select_slider("图宽 (像素/点数)", options=[500, 1000, 1500, 2000], value=1000)
+        with col2:
+            method = st.radio("原始数据级别的抽取方式", ["minmax", "lttb"], horizontal=True)
+
+        t_range = st.slider("时间范围 (ms)", 0.0, duration_ms, (0.0, duration_ms), format="%.3f")
+        start = int(t_range[0] * 1e-3 * fs)
+        stop = max(start + 1, int(t_range[1] * 1e-3 * fs))
+
+        # 时域包络
+        st.subheader("时域波形")
+        env = get_envelope_view(file_path, start, stop, max_points=width_px, method=method)
+        if env is not None:
+            level_text = "原始数据" if env["level"] < 0 else f"第 {env['level']} 层"
+            st.caption(f"使用 {level_text}，绘制 {len(env['time'])} 个点")
+            st.line_chart(pd.DataFrame({"min": env["min"], "max": env["max"]},
+                                       index=pd.Index(env["time"] * 1e3, name="时间 (ms)")))
+
+        # 语谱图
+        st.subheader("语谱图")
+        spec = get_spectrogram_view(file_path, start, stop, max_cols=width_px, max_rows=256)
+        if spec is None:
+            # None 既可能是视窗内没有完整的频谱帧，也可能是读取失败，分开提示
+            nfft, hop = info["nfft"], info["hop"]
+            if n_samples < nfft:
+                st.info(f"信号短于一帧 ({nfft} 点)，无法计算语谱图。")
+            elif start >= ((n_samples - nfft) // hop + 1) * hop:
+                st.info("当前时间范围内没有完整的频谱帧，请把起点往前移。")
+            else:
+                st.error("读取语谱图失败！")
+        else:
+            db = spec["db"]
+            lo, hi = np.percentile(db, [5, 99.9])
+            img = np.clip((db - lo) / max(hi - lo, 1e-6), 0.0, 1.0)
+            st.caption(f"使用第 {spec['level']} 层，{db.shape[0]} x {db.shape[1]} 像素，"
+                       f"频率 0 ~ {spec['freqs'][-1]/1e6:.1f} MHz (下方为低频)")
+            st.image(img[::-1], use_container_width=True, clamp=True)
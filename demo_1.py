@@ -28,4 +28,4 @@ print("特征提取成功！")
 print("\n--- 3. 查看输出的FeatureObject ---")
 print("输出类型:", type(feature_object))
 print("输出内容:")
-print(feature_object)
\ No newline at end of file
+print(feature_object.to_dataframe())
\ No newline at end of file
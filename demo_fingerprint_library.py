@@ -0,0 +1,146 @@
+import time
+
+import numpy as np
+
+from radar_sei_system.ml_modeling import FingerprintLibrary
+
+# 指纹库的可运行检查：精确搜索与暴力计算一致、IVF 召回率、未知辐射源拒识、
+# 不重建索引直接加入新辐射源，以及几个边界情况。
+
+D = 14                # 特征维度 (与 power_spectrum + vmd 的列数相同)
+N_EMITTERS = 2000
+PER_EMITTER = 30
+NOISE = 1.0           # 同一辐射源指纹的离散程度，辐射源中心的尺度为 10
+
+
+def make_fingerprints(centers, per_emitter, rng):
+    x = np.repeat(centers, per_emitter, axis=0) + NOISE * rng.standard_normal((centers.shape[0] * per_emitter, D))
+    labels = np.repeat(np.arange(centers.shape[0]), per_emitter).astype(str).tolist()
+    return x, labels
+
+
+def brute_force_top_k(lib, q, k):
+    """直接对库内所有指纹计算距离，每个辐射源取最小值。"""
+    qn = lib._normalize(q.reshape(1, -1))[0].astype(np.float64)
+    vectors = lib._vectors[:lib._n].astype(np.float64)
+    d = np.sqrt(np.sum((vectors - qn) ** 2, axis=1))
+    best = np.full(lib.n_emitters, np.inf)
+    np.minimum.at(best, lib._ids[:lib._n], d)
+    order = np.argsort(best)[:k]
+    return [lib.emitter_names[i] for i in order], best[order]
+
+
+def check_exact_search(centers, rng):
+    print("\n--- 1. 精确搜索与暴力计算的按辐射源最小距离一致 ---")
+    x, labels = make_fingerprints(centers[:200], PER_EMITTER, rng)
+    lib = FingerprintLibrary()
+    lib.add(x, labels)
+    assert not lib.is_partitioned
+
+    queries = centers[rng.integers(0, 200, 100)] + NOISE * rng.standard_normal((100, D))
+    for q, result in zip(queries, lib.query(queries, k=5)):
+        names, dists = brute_force_top_k(lib, q, 5)
+        assert [c["label"] for c in result["candidates"]] == names
+        assert np.allclose([c["distance"] for c in result["candidates"]], dists, rtol=1e-5)
+    print("100 个查询的前 5 个辐射源及距离全部一致")
+    print("通过")
+
+
+def check_ivf_recall(exact_lib, ivf_lib, queries):
+    print("\n--- 2. IVF 与精确搜索的召回率 ---")
+    assert ivf_lib.is_partitioned and not exact_lib.is_partitioned
+    exact = exact_lib.query(queries, k=5)
+    approx = ivf_lib.query(queries, k=5)
+    top1 = np.mean([a["predicted_label"] == e["predicted_label"] for a, e in zip(approx, exact)])
+    top5 = np.mean([len({c["label"] for c in a["candidates"]} & {c["label"] for c in e["candidates"]}) / 5
+                    for a, e in zip(approx, exact)])
+    print(f"top-1 召回率 {top1:.3f}，top-5 召回率 {top5:.3f}")
+    assert top1 >= 0.95, top1
+
+    # 单个查询走的是另一条代码路径，结果必须与批量查询相同
+    single = [ivf_lib.query(q, k=5)[0] for q in queries[:200]]
+    assert all(s["candidates"] == b["candidates"] for s, b in zip(single, approx[:200]))
+    print("通过")
+
+
+def check_unknown_rejection(lib, centers, rng):
+    print("\n--- 3. calibrate_threshold 之后的未知辐射源拒识 ---")
+    threshold = lib.calibrate_threshold(0.99)
+    print(f"拒识门限 {threshold:.3f}")
+
+    known = centers[rng.integers(0, N_EMITTERS, 500)] + NOISE * rng.standard_normal((500, D))
+    unknown_centers = rng.normal(size=(500, D)) * 10
+    unknown = unknown_centers + NOISE * rng.standard_normal((500, D))
+    false_reject = np.mean([r["is_unknown"] for r in lib.query(known)])
+    true_reject = np.mean([r["is_unknown"] and r["predicted_label"] == "unknown" for r in lib.query(unknown)])
+    print(f"已知辐射源误拒率 {false_reject:.3f}，未知辐射源拒识率 {true_reject:.3f}")
+    assert false_reject <= 0.05 and true_reject >= 0.95
+    print("通过")
+
+
+def check_insert_without_rebuild(lib, rng):
+    print("\n--- 4. 不重建索引直接加入新辐射源 ---")
+    centroids = lib._centroids
+    new_center = rng.normal(size=D) * 10
+    lib.add(new_center + NOISE * rng.standard_normal((PER_EMITTER, D)), ["new_emitter"] * PER_EMITTER)
+    assert lib._centroids is centroids, "少量插入不应重新训练分区"
+
+    queries = new_center + NOISE * rng.standard_normal((20, D))
+    # 看最近的候选而不是 predicted_label：拒识门限本身允许约 1% 的误拒
+    assert all(r["candidates"][0]["label"] == "new_emitter" for r in lib.query(queries))
+    print("新辐射源可以立即被识别，分区中心未变")
+    print("通过")
+
+
+def check_edge_cases(rng):
+    print("\n--- 5. 边界情况 ---")
+    lib = FingerprintLibrary(ivf_threshold=1000)
+    lib.build_index()  # 空库不应报错
+    for k in (0, -1):
+        try:
+            lib.query(np.zeros(D), k=k)
+            raise AssertionError(f"k={k} 应该抛出 ValueError")
+        except ValueError:
+            pass
+
+    # 同一次 add 既触发重新标准化又跨过 ivf_threshold，应立即建立分区
+    lib.add(rng.standard_normal((10, D)) * 0.01, ["a"] * 10)
+    lib.add(rng.standard_normal((2000, D)) * 100, ["b"] * 2000)
+    assert lib.is_partitioned, "跨过 ivf_threshold 后应建立分区"
+    print("通过")
+
+
+def report_latency(lib, centers, rng, n_queries=1000):
+    print("\n--- 6. 查询延迟 ---")
+    queries = centers[rng.integers(0, N_EMITTERS, n_queries)] + NOISE * rng.standard_normal((n_queries, D))
+    times = []
+    for q in queries:
+        t = time.perf_counter()
+        lib.query(q, k=5)
+        times.append(time.perf_counter() - t)
+    t = time.perf_counter()
+    lib.query(queries, k=5)
+    batch = (time.perf_counter() - t) / n_queries
+    p50, p95 = np.percentile(times, [50, 95]) * 1e3
+    print(f"{lib}: 单个查询 p50 {p50:.3f} ms, p95 {p95:.3f} ms；批量查询 {batch * 1e3:.3f} ms/个")
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(N_EMITTERS, D)) * 10
+
+    check_exact_search(centers, rng)
+
+    x, labels = make_fingerprints(centers, PER_EMITTER, rng)
+    exact_lib = FingerprintLibrary(ivf_threshold=np.inf)
+    exact_lib.add(x, labels)
+    ivf_lib = FingerprintLibrary(ivf_threshold=10_000)
+    ivf_lib.add(x, labels)
+    queries = centers[rng.integers(0, N_EMITTERS, 1000)] + NOISE * rng.standard_normal((1000, D))
+
+    check_ivf_recall(exact_lib, ivf_lib, queries)
+    check_unknown_rejection(ivf_lib, centers, rng)
+    check_insert_without_rebuild(ivf_lib, rng)
+    check_edge_cases(rng)
+    report_latency(ivf_lib, centers, rng)
+    print("\n全部检查通过！")
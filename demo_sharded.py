@@ -0,0 +1,167 @@
+import os
+import tempfile
+import threading
+import time
+
+import h5py
+import numpy as np
+
+from radar_sei_system.batch_scoring import (WorkQueue, make_shards, run_sharded, run_worker, score_files,
+                                            create_job, collect_results)
+from radar_sei_system.batch_scoring.main import LeaseHeartbeat
+from radar_sei_system.data_management import load_iq_data
+from radar_sei_system.feature_extraction import extract_features, FeatureMatrix
+from radar_sei_system.ml_modeling import train
+from radar_sei_system.performance_evaluation import merge_evaluations
+
+# 分片打分的可运行检查：租约过期接管、重试次数用完判失败、旧任务的 worker 不能处理新任务、
+# 后台续约、分片评估合并与整体评估一致。
+# run_sharded 用 spawn 启动 worker，子进程会重新导入主模块，
+# 所以调用它的脚本必须把入口代码放在 if __name__ == "__main__": 下面 (见文件末尾)。
+
+METHODS = ['power_spectrum']
+N_EMITTERS = 3
+FILES_PER_EMITTER = 8
+
+
+def write_mock_file(path, label, rng):
+    """写一个与 load_iq_data 格式相同的 .h5 文件：单音 (频率由辐射源决定) + 噪声。"""
+    n = 4096
+    t = np.arange(n) / 1e6
+    signal = np.cos(2 * np.pi * (50e3 + 100e3 * label) * t) + 0.3 * rng.standard_normal(n)
+    with h5py.File(path, 'w') as f:
+        f.create_dataset('IntraPulse/DATA', data=signal.reshape(1, -1))
+        f.create_dataset('InterPulse/LABEL', data=np.array([[label]]))
+        f.create_dataset('TAG/SampleRate', data=np.array([[1.0]]))  # 单位 MHz
+
+
+def check_expired_lease(db_path):
+    print("\n--- 1. 租约过期后被其他 worker 接管 ---")
+    queue = WorkQueue(db_path, lease_seconds=0.2, max_attempts=3)
+    job_id = queue.create_job(["a.h5", "b.h5"], 1, {})
+
+    _, shard_id, _ = queue.claim("worker-A")
+    assert queue.claim("worker-B") is None, "租约未过期时分片不应被再次领取"
+    time.sleep(0.3)
+    assert queue.claim("worker-B") == (job_id, shard_id, ["a.h5", "b.h5"]), "租约过期后应能被重新领取"
+    assert not queue.renew(job_id, shard_id, "worker-A"), "旧 worker 不应还能续约"
+    assert not queue.complete(job_id, shard_id, "worker-A", {"x": 1}), "旧 worker 的结果应被丢弃"
+    assert queue.complete(job_id, shard_id, "worker-B", {"x": 2})
+    assert queue.shards()[0]["result"] == {"x": 2} and queue.is_finished()
+    queue.close()
+    print("通过")
+
+
+def check_max_attempts(db_path):
+    print("\n--- 2. 重试次数用完后分片判为 failed ---")
+    # 情况一：每次领取后 worker 都崩溃 (租约过期)
+    queue = WorkQueue(db_path, lease_seconds=0.1, max_attempts=2)
+    queue.create_job(["a.h5"], 1, {})
+    for worker in ("worker-A", "worker-B"):
+        assert queue.claim(worker) is not None
+        time.sleep(0.15)
+    assert queue.claim("worker-C") is None, "重试次数用完后不应再被领取"
+    shard = queue.shards()[0]
+    assert shard["status"] == "failed" and shard["attempts"] == 2, shard
+    assert queue.is_finished()
+
+    # 情况二：worker 报告处理出错
+    queue.max_attempts = 1
+    job_id = queue.create_job(["a.h5"], 1, {})
+    _, shard_id, _ = queue.claim("worker-A")
+    queue.fail(job_id, shard_id, "worker-A", "boom")
+    shard = queue.shards()[0]
+    assert shard["status"] == "failed" and shard["error"] == "boom", shard
+    queue.close()
+    print("通过")
+
+
+def check_job_identity(file_paths, model_path, db_path):
+    print("\n--- 3. 重新创建任务后，旧任务的 worker 不能续约/提交，并会按新任务的配置处理 ---")
+    queue = WorkQueue(db_path, lease_seconds=60)
+    old_job = queue.create_job(["a.h5"], 1, {})
+    _, shard_id, _ = queue.claim("worker-A")
+    new_job = queue.create_job(["b.h5"], 1, {})
+    assert new_job != old_job
+    assert not queue.renew(old_job, shard_id, "worker-A"), "旧任务的租约不应能续约新任务的分片"
+    assert not queue.complete(old_job, shard_id, "worker-A", {"x": 1}), "旧任务的结果不应被接受"
+    assert queue.claim("worker-A")[0] == new_job
+
+    # 一个仍在轮询旧任务的 worker (旧任务的模型路径不存在，如果沿用旧配置分片会失败)
+    create_job(db_path, file_paths[:2], "/nonexistent/model.pkl", METHODS, 1)
+    queue.claim("worker-blocker")  # 占住旧任务唯一的分片，让 worker 保持轮询
+    worker = threading.Thread(target=run_worker, args=(db_path, "worker-polling", 60))
+    worker.start()
+    time.sleep(0.5)
+    n = create_job(db_path, file_paths, model_path, METHODS, 3)
+    worker.join(timeout=120)
+    queue.close()
+    assert not worker.is_alive()
+    result = collect_results(db_path)
+    assert result["status"] == {"done": n}, result["status"]
+    assert len(result["predictions"]) == len(file_paths)
+    print("通过")
+
+
+def check_heartbeat(db_path):
+    print("\n--- 4. 单个文件处理时间超过租约时，后台线程保持租约 ---")
+    queue = WorkQueue(db_path, lease_seconds=0.3)
+    job_id = queue.create_job(["a.h5"], 1, {})
+    _, shard_id, _ = queue.claim("worker-A")
+    with LeaseHeartbeat(db_path, job_id, shard_id, "worker-A", 0.3) as heartbeat:
+        time.sleep(1.0)  # 模拟一个很慢的文件
+        assert heartbeat.is_alive()
+        assert queue.claim("worker-B") is None, "续约期间分片不应被接管"
+    assert queue.complete(job_id, shard_id, "worker-A", {"x": 1})
+    queue.close()
+    print("通过")
+
+
+def check_merge_evaluations(file_paths, model_path, db_path):
+    print("\n--- 5. 分片评估合并结果与整体评估一致 ---")
+    whole = score_files(file_paths, model_path, METHODS)["evaluation"]
+    parts = [score_files(shard, model_path, METHODS)["evaluation"] for shard in make_shards(file_paths, 4)]
+    merged = merge_evaluations(parts)
+    assert merged["labels_in_matrix"] == whole["labels_in_matrix"]
+    assert np.array_equal(merged["confusion_matrix"], whole["confusion_matrix"])
+    assert np.isclose(merged["accuracy"], whole["accuracy"])
+    print(f"整体准确率 {whole['accuracy']:.3f}，合并后 {merged['accuracy']:.3f}")
+
+    result = run_sharded(file_paths, model_path, METHODS, n_workers=2, db_path=db_path, n_shards=5)
+    assert result["status"] == {"done": 5}, result["status"]
+    assert [p["file"] for p in result["predictions"]] == [os.path.abspath(p) for p in file_paths]
+    assert np.array_equal(result["evaluation"]["confusion_matrix"], whole["confusion_matrix"])
+    print("run_sharded (2 个 worker) 的结果与单进程一致")
+
+    # 没有文件时返回空结果，而不是 db_path 里上一个任务的结果
+    empty = run_sharded([], model_path, METHODS, db_path=db_path)
+    assert empty["predictions"] == [] and empty["evaluation"] is None and empty["status"] == {}
+    print("通过")
+
+
+if __name__ == "__main__":
+    work_dir = tempfile.mkdtemp(prefix="sharded_check_")
+    # train() 把模型保存在当前目录下的 saved_models，切换目录避免覆盖已有模型
+    os.chdir(work_dir)
+    print(f"工作目录: {work_dir}")
+
+    rng = np.random.default_rng(0)
+    file_paths = []
+    for label in range(N_EMITTERS):
+        for i in range(FILES_PER_EMITTER):
+            path = os.path.join(work_dir, f"emitter{label}_{i}.h5")
+            write_mock_file(path, label, rng)
+            file_paths.append(path)
+
+    # 只用前两个辐射源训练，第三个辐射源必然被误判，混淆矩阵里才有非对角元素
+    features = FeatureMatrix.from_methods(METHODS, capacity=len(file_paths))
+    for path in file_paths[:2 * FILES_PER_EMITTER:2]:
+        extract_features(load_iq_data(path), METHODS, out=features)
+    model_path, _ = train(features, None, "LogisticRegression", {})
+
+    check_expired_lease(os.path.join(work_dir, "lease.sqlite"))
+    check_max_attempts(os.path.join(work_dir, "attempts.sqlite"))
+    check_job_identity(file_paths, model_path, os.path.join(work_dir, "jobs.sqlite"))
+    check_heartbeat(os.path.join(work_dir, "heartbeat.sqlite"))
+    check_merge_evaluations(file_paths, model_path, os.path.join(work_dir, "sharded.sqlite"))
+    print("\n全部检查通过！")
@@ -0,0 +1,3 @@
+# 这行代码让我们可以通过 from radar_sei_system.batch_scoring import run_sharded 的方式调用
+from .main import run_sharded, run_worker, create_job, collect_results, score_files
+from .work_queue import WorkQueue, make_shards
@@ -0,0 +1,56 @@
+"""
+命令行入口，用于在多台机器 (共享文件系统) 上协同打分：
+
+    # 任意一台机器上创建任务
+    python -m radar_sei_system.batch_scoring init --db /shared/job.sqlite \
+        --model /shared/mvp_model.pkl --methods power_spectrum --shards 64 /shared/data/*.h5
+
+    # 每台机器上启动若干个 worker
+    python -m radar_sei_system.batch_scoring worker --db /shared/job.sqlite
+
+    # 全部完成后汇总
+    python -m radar_sei_system.batch_scoring collect --db /shared/job.sqlite
+"""
+import argparse
+import json
+
+from .main import create_job, run_worker, collect_results
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m radar_sei_system.batch_scoring")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_init = sub.add_parser("init", help="创建分片任务")
+    p_init.add_argument("--db", required=True)
+    p_init.add_argument("--model", required=True)
+    p_init.add_argument("--methods", nargs="+", default=["power_spectrum"])
+    p_init.add_argument("--shards", type=int, default=16)
+    p_init.add_argument("files", nargs="+")
+
+    p_worker = sub.add_parser("worker", help="启动一个 worker")
+    p_worker.add_argument("--db", required=True)
+    p_worker.add_argument("--worker-id", default=None)
+    p_worker.add_argument("--lease-seconds", type=float, default=300)
+
+    p_collect = sub.add_parser("collect", help="汇总所有分片的结果")
+    p_collect.add_argument("--db", required=True)
+
+    args = parser.parse_args()
+
+    if args.command == "init":
+        n = create_job(args.db, args.files, args.model, args.methods, args.shards)
+        print(f"已创建 {n} 个分片 -> {args.db}")
+    elif args.command == "worker":
+        n = run_worker(args.db, worker_id=args.worker_id, lease_seconds=args.lease_seconds)
+        print(f"worker 结束，共完成 {n} 个分片。")
+    elif args.command == "collect":
+        results = collect_results(args.db)
+        evaluation = results.get("evaluation")
+        if evaluation and evaluation.get("confusion_matrix") is not None:
+            evaluation["confusion_matrix"] = evaluation["confusion_matrix"].tolist()
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+import multiprocessing
+import os
+import threading
+import time
+
+from ..data_management import load_iq_data
+from ..feature_extraction import extract_features, FeatureMatrix
+from ..ml_modeling import predict
+from ..performance_evaluation import evaluate, merge_evaluations
+from .work_queue import WorkQueue, default_worker_id, DEFAULT_LEASE_SECONDS, DEFAULT_MAX_ATTEMPTS
+
+# 没有可领取的分片、但还有分片被其他 worker 持有时的轮询间隔
+POLL_INTERVAL_SECONDS = 1.0
+# 处理分片期间每隔 lease_seconds / HEARTBEATS_PER_LEASE 续约一次
+HEARTBEATS_PER_LEASE = 3
+
+
+class LeaseLostError(Exception):
+    """分片租约已被其他 worker 接管，或任务已被重新创建。"""
+
+
+class LeaseHeartbeat:
+    """
+    后台续约线程：处理分片期间每隔 lease_seconds / 3 续约一次，
+    与单个文件 (load + welch + VMD) 的处理时间无关。
+
+    SQLite 连接不能跨线程使用，线程里单独打开一个 WorkQueue 连接。
+    """
+
+    def __init__(self, db_path: str, job_id: str, shard_id: int, worker_id: str, lease_seconds: float):
+        self.db_path = db_path
+        self.job_id = job_id
+        self.shard_id = shard_id
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self._stop = threading.Event()
+        self._lost = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def is_alive(self) -> bool:
+        """租约是否仍由本 worker 持有，作为 score_files 的 heartbeat 回调。"""
+        return not self._lost.is_set()
+
+    def _run(self):
+        queue = WorkQueue(self.db_path, lease_seconds=self.lease_seconds)
+        try:
+            while not self._stop.wait(self.lease_seconds / HEARTBEATS_PER_LEASE):
+                try:
+                    if not queue.renew(self.job_id, self.shard_id, self.worker_id):
+                        self._lost.set()
+                        return
+                except Exception as e:
+                    # 临时的数据库错误 (例如锁等待超时) 不放弃分片，下一轮再试
+                    print(f"[{self.worker_id}] 分片 {self.shard_id} 续约失败: {e}")
+        finally:
+            queue.close()
+
+
+def score_files(file_paths: list, model_path: str, methods: list, heartbeat=None) -> dict:
+    """
+    对一组文件执行 load_iq_data -> extract_features -> predict -> evaluate。
+
+    Args:
+        file_paths (list): 要处理的 .h5 文件路径。
+        model_path (str): 已训练模型的路径。
+        methods (list): 特征提取方法 (必须与训练时一致)。
+        heartbeat (callable): 每个文件处理前后各调用一次，返回 False (租约已失效) 时放弃本分片。
+                              续约本身由 run_worker 的后台线程完成。
+
+    Returns:
+        dict: 可 JSON 序列化的分片结果
+              {"predictions": [...], "skipped": [...], "evaluation": EvaluationObject 或 None}。
+    """
+    features = FeatureMatrix.from_methods(methods, capacity=len(file_paths))
+    scored_files = []
+    skipped = []
+
+    for path in file_paths:
+        if heartbeat is not None and not heartbeat():
+            raise LeaseLostError(f"租约已失效，放弃处理 ({path})")
+
+        data_obj = load_iq_data(path)
+        if not data_obj:
+            skipped.append({"file": path, "reason": "load failed"})
+        elif extract_features(data_obj, methods=methods, out=features).empty:
+            skipped.append({"file": path, "reason": "feature extraction failed"})
+        else:
+            scored_files.append(path)
+
+        if heartbeat is not None and not heartbeat():
+            raise LeaseLostError(f"租约已失效，放弃处理 ({path})")
+
+    predictions = []
+    evaluation = None
+    if scored_files:
+        prediction_list = predict(features, model_path)
+        if len(prediction_list) != len(scored_files):
+            raise RuntimeError("预测执行失败！请检查模型与特征是否匹配。")
+
+        true_labels = features.labels.tolist()
+        for path, p, label in zip(scored_files, prediction_list, true_labels):
+            predictions.append({
+                "file": path,
+                "predicted_label": str(p["predicted_label"]),
+                "probabilities": {str(k): float(v) for k, v in p["probabilities"].items()},
+                "true_label": label,
+            })
+
+        # 只有带有效标签的文件参与评估
+        labelled = [(p, label) for p, label in zip(prediction_list, true_labels)
+                    if label and label != "unknown"]
+        if labelled:
+            evaluation = evaluate([p for p, _ in labelled], [label for _, label in labelled])
+            if evaluation.get("confusion_matrix") is not None:
+                evaluation["confusion_matrix"] = evaluation["confusion_matrix"].tolist()
+                evaluation["labels_in_matrix"] = [str(x) for x in evaluation["labels_in_matrix"]]
+                evaluation["accuracy"] = float(evaluation["accuracy"])
+
+    return {"predictions": predictions, "skipped": skipped, "evaluation": evaluation}
+
+
+def run_worker(db_path: str, worker_id: str = None, lease_seconds: float = DEFAULT_LEASE_SECONDS,
+               max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> int:
+    """
+    worker 主循环：反复领取分片、处理、提交，直到所有分片都结束 (done 或 failed)。
+
+    别的 worker 崩溃时，它持有的分片会在租约到期后被本循环重新领取，
+    所以只要还有一个 worker 活着，任务就能完成。
+    处理分片期间由后台线程定期续约；领到的分片属于新任务 (job_id 变化) 时重新读取任务配置。
+
+    Returns:
+        int: 本 worker 成功提交的分片数。
+    """
+    worker_id = worker_id or default_worker_id()
+    queue = WorkQueue(db_path, lease_seconds=lease_seconds, max_attempts=max_attempts)
+    job = queue.get_job()
+    if job is None:
+        print(f"错误：任务队列中没有任务配置 -> {db_path}")
+        queue.close()
+        return 0
+    job_id, config = job
+
+    n_done = 0
+    try:
+        while True:
+            claimed = queue.claim(worker_id)
+            if claimed is None:
+                if queue.is_finished():
+                    break
+                time.sleep(POLL_INTERVAL_SECONDS)
+                continue
+
+            claimed_job_id, shard_id, files = claimed
+            if claimed_job_id != job_id:
+                # 任务已被重新创建：按新任务的模型和特征方法处理
+                job = queue.get_job()
+                if job is None or job[0] != claimed_job_id:
+                    # 读取配置的同时任务又被替换了，这个分片已不存在，直接领取下一个
+                    continue
+                job_id, config = job
+                print(f"[{worker_id}] 检测到新任务 {job_id}，已重新读取任务配置")
+
+            print(f"[{worker_id}] 开始处理分片 {shard_id} ({len(files)} 个文件)")
+            try:
+                with LeaseHeartbeat(db_path, job_id, shard_id, worker_id, lease_seconds) as heartbeat:
+                    result = score_files(files, config["model_path"], config["methods"],
+                                         heartbeat=heartbeat.is_alive)
+            except LeaseLostError as e:
+                print(f"[{worker_id}] 分片 {shard_id}: {e}")
+                continue
+            except Exception as e:
+                print(f"[{worker_id}] 分片 {shard_id} 处理失败: {e}")
+                queue.fail(job_id, shard_id, worker_id, str(e))
+                continue
+
+            if queue.complete(job_id, shard_id, worker_id, result):
+                n_done += 1
+            else:
+                print(f"[{worker_id}] 分片 {shard_id} 的租约已被接管，结果被丢弃。")
+    finally:
+        queue.close()
+
+    return n_done
+
+
+def create_job(db_path: str, file_paths: list, model_path: str, methods: list, n_shards: int) -> int:
+    """
+    在 db_path 创建一个新的分片打分任务 (会覆盖同一文件里的旧任务)。
+
+    Returns:
+        int: 实际的分片数。
+    """
+    queue = WorkQueue(db_path)
+    try:
+        config = {"model_path": os.path.abspath(model_path), "methods": list(methods)}
+        queue.create_job([os.path.abspath(p) for p in file_paths], n_shards, config)
+        return len(queue.shards())
+    finally:
+        queue.close()
+
+
+def collect_results(db_path: str) -> dict:
+    """
+    合并所有已完成分片的预测结果和评估结果。
+
+    Returns:
+        dict: {"predictions": 按原始文件顺序排列的预测列表, "skipped": [...],
+               "evaluation": 合并后的 EvaluationObject, "failed_shards": [...], "status": {...}}
+    """
+    queue = WorkQueue(db_path)
+    try:
+        file_order = queue.get_job_value("file_order") or []
+        shards = queue.shards()
+        status = queue.status_counts()
+    finally:
+        queue.close()
+
+    predictions, skipped, evaluations, failed = [], [], [], []
+    for shard in shards:
+        if shard["status"] == "done":
+            predictions.extend(shard["result"]["predictions"])
+            skipped.extend(shard["result"]["skipped"])
+            if shard["result"]["evaluation"]:
+                evaluations.append(shard["result"]["evaluation"])
+        elif shard["status"] == "failed":
+            failed.append({"shard_id": shard["shard_id"], "files": shard["files"],
+                           "error": shard["error"]})
+
+    position = {os.path.abspath(p): i for i, p in enumerate(file_order)}
+    predictions.sort(key=lambda p: position.get(p["file"], len(position)))
+
+    return {
+        "predictions": predictions,
+        "skipped": skipped,
+        "evaluation": merge_evaluations(evaluations) if evaluations else None,
+        "failed_shards": failed,
+        "status": status,
+    }
+
+
+def run_sharded(file_paths: list, model_path: str, methods: list, n_workers: int = 4,
+                db_path: str = "./sharded_scoring.sqlite", n_shards: int = None,
+                lease_seconds: float = DEFAULT_LEASE_SECONDS) -> dict:
+    """
+    在本机用 n_workers 个独立进程并行打分，并返回合并后的结果。
+
+    其他机器可以用 `python -m radar_sei_system.batch_scoring worker --db <db_path>`
+    加入同一个任务 (需要共享文件系统)。
+
+    注意：worker 用 spawn 方式启动，子进程会重新导入调用者的主模块。
+    在脚本里调用时必须把调用代码放在 `if __name__ == "__main__":` 下面，
+    否则每个 worker 都会再次执行 run_sharded (示例见 demo_sharded.py)。
+
+    Args:
+        file_paths (list): 要打分的 .h5 文件。
+        model_path (str): 已训练模型的路径。
+        methods (list): 特征提取方法 (必须与训练时一致)。
+        n_workers (int): 本机启动的 worker 进程数。
+        db_path (str): SQLite 任务队列文件路径。
+        n_shards (int): 分片数，默认是 worker 数的 4 倍，让快慢不同的 worker 能自动均衡。
+        lease_seconds (float): 分片租约时长 (秒)。
+
+    Returns:
+        dict: 与 collect_results 相同。有 worker 异常退出且仍有分片未完成时会打印警告，
+              此时结果只包含已完成的分片 (status 中可以看到未完成的数量)。
+    """
+    if not file_paths:
+        # 不能返回 db_path 里上一个任务的结果
+        print("错误：没有需要处理的文件。")
+        return {"predictions": [], "skipped": [], "evaluation": None, "failed_shards": [], "status": {}}
+
+    n_shards = n_shards or n_workers * 4
+    n = create_job(db_path, file_paths, model_path, methods, n_shards)
+    print(f"--- 已创建 {n} 个分片，启动 {n_workers} 个 worker ---")
+
+    # spawn：每个 worker 都是全新的解释器，与在其他机器上启动的 worker 行为一致
+    ctx = multiprocessing.get_context("spawn")
+    workers = [ctx.Process(target=run_worker, args=(db_path, None, lease_seconds))
+               for _ in range(n_workers)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+
+    results = collect_results(db_path)
+    unfinished = results["status"].get("pending", 0) + results["status"].get("leased", 0)
+    if unfinished:
+        exit_codes = [w.exitcode for w in workers]
+        print(f"警告：{unfinished} 个分片未完成 (worker 退出码: {exit_codes})，返回的只是部分结果。"
+              f"可以用 `python -m radar_sei_system.batch_scoring worker --db {db_path}` 继续处理，"
+              "再调用 collect_results 汇总。")
+    return results
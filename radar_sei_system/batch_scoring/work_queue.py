@@ -0,0 +1,220 @@
+import json
+import os
+import socket
+import sqlite3
+import time
+import uuid
+
+# 租约超时后分片会被其他 worker 重新领取；worker 处理每个文件后都会续约
+DEFAULT_LEASE_SECONDS = 300
+# 一个分片最多被领取的次数 (含第一次)，超过后标记为 failed
+DEFAULT_MAX_ATTEMPTS = 3
+
+_JOB_SCHEMA = """
+CREATE TABLE IF NOT EXISTS job (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+)
+"""
+# 每个分片都记录所属任务的 job_id：重新创建任务后，旧任务的 worker 无法续约或提交新任务的分片
+_SHARDS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS shards (
+    job_id        TEXT NOT NULL,
+    shard_id      INTEGER NOT NULL,
+    files         TEXT NOT NULL,
+    status        TEXT NOT NULL DEFAULT 'pending',
+    worker        TEXT,
+    lease_expires REAL,
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    result        TEXT,
+    error         TEXT,
+    PRIMARY KEY (job_id, shard_id)
+)
+"""
+
+
+def make_shards(file_paths: list, n_shards: int) -> list:
+    """
+    把文件列表确定性地切分成 n_shards 个分片。
+
+    先按路径排序再轮流分配，同一个文件列表无论以什么顺序传入、在哪台机器上切分，
+    得到的分片都完全相同。
+    """
+    files = sorted(file_paths)
+    n_shards = max(1, min(int(n_shards), len(files)))
+    return [files[i::n_shards] for i in range(n_shards)]
+
+
+class WorkQueue:
+    """
+    基于 SQLite 文件的分片任务队列。
+
+    多个 worker 进程 (可以在不同机器上，只要能访问同一个文件) 通过它领取分片、
+    续约、提交结果。所有状态修改都在 BEGIN IMMEDIATE 事务里完成，同一时刻只有一个
+    worker 能领到同一个分片；worker 崩溃后，租约到期的分片会被其他 worker 重新领取。
+
+    注意：SQLite 的文件锁依赖文件系统，NFS 等网络文件系统上的锁不一定可靠。
+    """
+
+    def __init__(self, db_path: str, lease_seconds: float = DEFAULT_LEASE_SECONDS,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        # isolation_level=None：由我们自己显式控制事务
+        self._conn = sqlite3.connect(db_path, timeout=60, isolation_level=None)
+        self._conn.execute(_JOB_SCHEMA)
+        self._conn.execute(_SHARDS_SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def _execute_locked(self, fn):
+        # BEGIN IMMEDIATE 先拿到写锁，避免两个 worker 同时读到同一个待领取的分片
+        cur = self._conn.cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(cur)
+            cur.execute("COMMIT")
+            return result
+        except Exception:
+            cur.execute("ROLLBACK")
+            raise
+
+    # ------------------------------------------------------------------
+    # 创建任务
+    # ------------------------------------------------------------------
+    def create_job(self, file_paths: list, n_shards: int, config: dict) -> str:
+        """
+        清空旧任务，写入新的分片和任务配置 (模型路径、特征方法等)。
+
+        Returns:
+            str: 新任务的 job_id。
+        """
+        shards = make_shards(file_paths, n_shards)
+        job_id = uuid.uuid4().hex
+
+        def _create(cur):
+            cur.execute("DELETE FROM job")
+            # 重建分片表：旧版本创建的文件里没有 job_id 列
+            cur.execute("DROP TABLE IF EXISTS shards")
+            cur.execute(_SHARDS_SCHEMA)
+            cur.executemany("INSERT INTO job (key, value) VALUES (?, ?)", [
+                ("job_id", json.dumps(job_id)),
+                ("config", json.dumps(config)),
+                ("file_order", json.dumps(list(file_paths))),
+            ])
+            cur.executemany("INSERT INTO shards (job_id, shard_id, files) VALUES (?, ?, ?)",
+                            [(job_id, i, json.dumps(files)) for i, files in enumerate(shards)])
+
+        self._execute_locked(_create)
+        return job_id
+
+    def get_job_value(self, key: str):
+        row = self._conn.execute("SELECT value FROM job WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_job(self) -> tuple:
+        """在同一次读取里返回 (job_id, config)，保证两者属于同一个任务；没有任务时返回 None。"""
+        values = {key: json.loads(value) for key, value in
+                  self._conn.execute("SELECT key, value FROM job WHERE key IN ('job_id', 'config')")}
+        if "job_id" not in values or "config" not in values:
+            return None
+        return values["job_id"], values["config"]
+
+    # ------------------------------------------------------------------
+    # worker 侧
+    # ------------------------------------------------------------------
+    def claim(self, worker_id: str):
+        """
+        领取一个待处理 (或租约已过期) 的分片。
+
+        Returns:
+            (str, int, list): (job_id, 分片编号, 文件列表)；没有可领取的分片时返回 None。
+            之后的 renew / complete / fail 都必须带上这个 job_id。
+        """
+        def _claim(cur):
+            now = time.time()
+            # 租约过期且重试次数已用完的分片直接判为失败
+            cur.execute(
+                "UPDATE shards SET status = 'failed', "
+                "error = COALESCE(error, 'lease expired') || ' (max attempts reached)' "
+                "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, self.max_attempts))
+            row = cur.execute(
+                "SELECT job_id, shard_id, files FROM shards "
+                "WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?) "
+                "ORDER BY shard_id LIMIT 1", (now,)).fetchone()
+            if row is None:
+                return None
+            cur.execute(
+                "UPDATE shards SET status = 'leased', worker = ?, lease_expires = ?, "
+                "attempts = attempts + 1 WHERE job_id = ? AND shard_id = ?",
+                (worker_id, now + self.lease_seconds, row[0], row[1]))
+            return row[0], row[1], json.loads(row[2])
+
+        return self._execute_locked(_claim)
+
+    def renew(self, job_id: str, shard_id: int, worker_id: str) -> bool:
+        """续约。返回 False 表示租约已被别的 worker 接管 (或任务已被替换)，当前 worker 应放弃这个分片。"""
+        def _renew(cur):
+            cur.execute(
+                "UPDATE shards SET lease_expires = ? "
+                "WHERE job_id = ? AND shard_id = ? AND worker = ? AND status = 'leased'",
+                (time.time() + self.lease_seconds, job_id, shard_id, worker_id))
+            return cur.rowcount == 1
+
+        return self._execute_locked(_renew)
+
+    def complete(self, job_id: str, shard_id: int, worker_id: str, result: dict) -> bool:
+        """提交分片结果。只有仍持有租约的 worker 才能提交，防止超时的旧 worker 或旧任务覆盖结果。"""
+        def _complete(cur):
+            cur.execute(
+                "UPDATE shards SET status = 'done', result = ?, lease_expires = NULL "
+                "WHERE job_id = ? AND shard_id = ? AND worker = ? AND status = 'leased'",
+                (json.dumps(result), job_id, shard_id, worker_id))
+            return cur.rowcount == 1
+
+        return self._execute_locked(_complete)
+
+    def fail(self, job_id: str, shard_id: int, worker_id: str, error: str):
+        """报告分片处理出错：还有重试次数时放回队列，否则标记为 failed。"""
+        def _fail(cur):
+            cur.execute(
+                "UPDATE shards SET "
+                "status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "error = ?, lease_expires = NULL "
+                "WHERE job_id = ? AND shard_id = ? AND worker = ? AND status = 'leased'",
+                (self.max_attempts, error, job_id, shard_id, worker_id))
+
+        self._execute_locked(_fail)
+
+    # ------------------------------------------------------------------
+    # 汇总侧
+    # ------------------------------------------------------------------
+    def status_counts(self) -> dict:
+        rows = self._conn.execute("SELECT status, COUNT(*) FROM shards GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def is_finished(self) -> bool:
+        counts = self.status_counts()
+        return counts.get('pending', 0) == 0 and counts.get('leased', 0) == 0
+
+    def shards(self) -> list:
+        rows = self._conn.execute(
+            "SELECT shard_id, files, status, worker, attempts, result, error "
+            "FROM shards ORDER BY shard_id").fetchall()
+        return [{
+            "shard_id": r[0],
+            "files": json.loads(r[1]),
+            "status": r[2],
+            "worker": r[3],
+            "attempts": r[4],
+            "result": json.loads(r[5]) if r[5] else None,
+            "error": r[6],
+        } for r in rows]
+
+
+def default_worker_id() -> str:
+    """主机名 + 进程号，足以区分同一共享文件系统上的所有 worker。"""
+    return f"{socket.gethostname()}:{os.getpid()}"
@@ -1,2 +1,3 @@
 # 这行代码让我们可以通过 from radar_sei_system.feature_extraction import extract_features 的方式调用
-from .main import extract_features
\ No newline at end of file
+from .main import extract_features
+from .feature_matrix import FeatureMatrix, feature_columns, as_feature_array
@@ -0,0 +1,152 @@
+import numpy as np
+import pandas as pd
+
+try:
+    from .methods import PSD_FEATURE_NAMES, VMD_FEATURE_NAMES
+except ImportError:
+    # 允许脚本在某些情况下被直接运行时也能工作
+    from methods import PSD_FEATURE_NAMES, VMD_FEATURE_NAMES
+
+# 方法名 -> 该方法输出的特征列。新增特征方法时在这里登记
+METHOD_COLUMNS = {
+    'power_spectrum': PSD_FEATURE_NAMES,
+    'vmd': VMD_FEATURE_NAMES,
+}
+
+
+def feature_columns(methods: list) -> list:
+    """
+    根据选择的特征方法返回固定的列顺序 (与 methods 中的先后顺序无关)。
+    """
+    columns = []
+    for method, names in METHOD_COLUMNS.items():
+        if method in methods:
+            columns.extend(names)
+    return columns
+
+
+def as_feature_array(features) -> np.ndarray:
+    """
+    把 FeatureMatrix / DataFrame / 数组统一转换成 float64 的二维特征数组。
+    FeatureMatrix 直接返回其底层数组的视图，不做复制。
+    """
+    if isinstance(features, FeatureMatrix):
+        return features.values
+    x = np.asarray(features, dtype=np.float64)
+    if x.ndim == 1:
+        x = x.reshape(1, -1)
+    return x
+
+
+class FeatureMatrix:
+    """
+    列式存储的特征矩阵 (FeatureObject)。
+
+    特征保存在一个预分配的 float64 二维数组里，标签保存在旁边的一维数组里。
+    追加行时只写入数组，容量不够时按倍数扩容，不会为每一行创建 pandas 对象；
+    只有在需要展示时才通过 to_dataframe() 转成 DataFrame。
+    """
+
+    def __init__(self, columns: list, capacity: int = 16):
+        self.columns = list(columns)
+        self._col_index = {name: j for j, name in enumerate(self.columns)}
+        capacity = max(int(capacity), 1)
+        self._data = np.zeros((capacity, len(self.columns)), dtype=np.float64)
+        self._labels = np.empty(capacity, dtype=object)
+        self._n = 0
+
+    @classmethod
+    def from_methods(cls, methods: list, capacity: int = 16) -> "FeatureMatrix":
+        """按选择的特征方法创建一个空的特征矩阵。"""
+        return cls(feature_columns(methods), capacity=capacity)
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, labels: list = None) -> "FeatureMatrix":
+        """从已有的 DataFrame (旧版 FeatureObject) 转换过来。"""
+        matrix = cls(list(df.columns), capacity=len(df))
+        matrix.extend(df.to_numpy(dtype=np.float64), labels)
+        return matrix
+
+    def __len__(self) -> int:
+        return self._n
+
+    def __repr__(self) -> str:
+        return f"FeatureMatrix(rows={self._n}, columns={self.columns})"
+
+    @property
+    def empty(self) -> bool:
+        return self._n == 0
+
+    @property
+    def shape(self) -> tuple:
+        return (self._n, len(self.columns))
+
+    @property
+    def values(self) -> np.ndarray:
+        """已写入部分的特征数组 (视图，不复制)。"""
+        return self._data[:self._n]
+
+    @property
+    def labels(self) -> np.ndarray:
+        """已写入部分的标签数组 (视图，不复制)。未提供标签的行为 None。"""
+        return self._labels[:self._n]
+
+    def _reserve(self, n_rows: int):
+        # 容量不够时至少翻倍，保证逐行追加的均摊开销是 O(1)
+        if n_rows <= self._data.shape[0]:
+            return
+        new_capacity = max(n_rows, 2 * self._data.shape[0])
+        data = np.zeros((new_capacity, len(self.columns)), dtype=np.float64)
+        data[:self._n] = self._data[:self._n]
+        labels = np.empty(new_capacity, dtype=object)
+        labels[:self._n] = self._labels[:self._n]
+        self._data = data
+        self._labels = labels
+
+    def append(self, features: dict, label=None):
+        """
+        追加一行。features 的键必须与本矩阵的列完全一致 (顺序无关)。
+        特征方法失败时由方法本身返回全 0 的占位特征，这里不做任何补零。
+        """
+        unknown = [name for name in features if name not in self._col_index]
+        if unknown:
+            raise ValueError(f"特征不属于本矩阵的列：{unknown}")
+        missing = [name for name in self.columns if name not in features]
+        if missing:
+            raise ValueError(f"缺少特征列：{missing}")
+
+        self._reserve(self._n + 1)
+        row = self._data[self._n]
+        for name, value in features.items():
+            row[self._col_index[name]] = value
+        self._labels[self._n] = label
+        self._n += 1
+
+    def extend(self, values: np.ndarray, labels: list = None):
+        """
+        批量追加多行。values 的列顺序必须与 self.columns 一致。
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if values.ndim == 1:
+            values = values.reshape(1, -1)
+        if values.shape[1] != len(self.columns):
+            raise ValueError(f"列数不匹配：期望 {len(self.columns)} 列，实际 {values.shape[1]} 列")
+        if labels is not None and len(labels) != values.shape[0]:
+            raise ValueError(f"标签数量 ({len(labels)}) 与行数 ({values.shape[0]}) 不一致")
+
+        n_new = values.shape[0]
+        self._reserve(self._n + n_new)
+        self._data[self._n:self._n + n_new] = values
+        if labels is not None:
+            self._labels[self._n:self._n + n_new] = list(labels)
+        self._n += n_new
+
+    def concat(self, other: "FeatureMatrix"):
+        """把另一个特征矩阵的所有行追加进来 (列结构必须相同)。"""
+        if other.columns != self.columns:
+            raise ValueError("列结构不一致，无法合并特征矩阵")
+        self.extend(other.values, other.labels)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """转换成 DataFrame，仅用于展示或导出。"""
+        return pd.DataFrame(self.values.copy(), columns=self.columns)
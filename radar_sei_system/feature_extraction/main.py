@@ -1,23 +1,34 @@
-import pandas as pd
 import numpy as np
 
 # 导入同目录下的methods.py中的函数
 try:
     from .methods import calculate_power_spectrum_features, calculate_vmd_features
+    from .feature_matrix import FeatureMatrix, feature_columns
 except ImportError:
     # 允许脚本在某些情况下被直接运行时也能工作
     from methods import calculate_power_spectrum_features, calculate_vmd_features
+    from feature_matrix import FeatureMatrix, feature_columns
 
-def extract_features(data: dict, methods: list) -> pd.DataFrame:
+def extract_features(data: dict, methods: list, out: FeatureMatrix = None) -> FeatureMatrix:
     """
     主接口函数，根据指令调用不同的特征提取方法。
+
+    提取结果作为一行 (连同 data 中的 label) 追加到 out 中并返回 out；
+    不传 out 时新建一个只有一行的 FeatureMatrix。
+    批量处理时请传入同一个 out，避免为每个文件创建单独的对象。
+    提取失败时返回一个空的 FeatureMatrix，out 保持不变。
+    out 的列与 methods 对应的列不一致时抛出 ValueError (在提取之前检查)。
     """
+    if out is not None and out.columns != feature_columns(methods):
+        raise ValueError(f"out 的列 {out.columns} 与特征方法 {methods} 的列 "
+                         f"{feature_columns(methods)} 不一致")
+
     iq_data = data.get("iq_data")
     fs = data.get("sampling_rate")
     
     if iq_data is None or fs is None:
         print("错误：DataObject中缺少iq_data或sampling_rate")
-        return pd.DataFrame()
+        return FeatureMatrix.from_methods(methods)
 
     # 最终的特征字典
     all_features = {}
@@ -39,10 +50,11 @@ def extract_features(data: dict, methods: list) -> pd.DataFrame:
     if not all_features:
         # 这就是你看到的日志
         print("警告：没有选择任何有效的特征提取方法。(或所有方法均提取失败)") 
-        return pd.DataFrame()
+        return FeatureMatrix.from_methods(methods)
 
-    # 将所有提取的特征转换成Pandas DataFrame格式
-    for key in all_features:
-        all_features[key] = [all_features[key]] # 将单个值变成只有一个元素的列表
+    # 直接写入特征矩阵的下一行
+    if out is None:
+        out = FeatureMatrix.from_methods(methods, capacity=1)
+    out.append(all_features, label=data.get("label"))
 
-    return pd.DataFrame(all_features)
\ No newline at end of file
+    return out
\ No newline at end of file
@@ -3,6 +3,11 @@ from scipy.signal import welch
 from scipy.stats import kurtosis, entropy
 from vmdpy import VMD
 
+# 每种方法输出的特征列 (固定顺序)，FeatureMatrix 用它们来确定列结构
+PSD_FEATURE_NAMES = ['psd_kurtosis', 'psd_centroid', 'psd_bandwidth', 'psd_flatness']
+VMD_K = 5 # VMD 分解的模态数
+VMD_FEATURE_NAMES = [name for k in range(VMD_K) for name in (f'vmd_energy_{k}', f'vmd_entropy_{k}')]
+
 def calculate_power_spectrum_features(iq_data: np.ndarray, fs: float) -> dict:
     """
     计算给定IQ信号的功率谱密度(PSD)并提取特征。
@@ -11,11 +16,11 @@ def calculate_power_spectrum_features(iq_data: np.ndarray, fs: float) -> dict:
         freqs, psd = welch(iq_data, fs=fs, nperseg=1024, scaling='density')
     except Exception as e:
         print(f"PSD Welch 计算失败: {e}")
-        return {'psd_kurtosis': 0, 'psd_centroid': 0, 'psd_bandwidth': 0, 'psd_flatness': 0}
+        return {name: 0 for name in PSD_FEATURE_NAMES}
 
     psd_safe = psd[psd > 0]
     if psd_safe.size == 0:
-        return {'psd_kurtosis': 0, 'psd_centroid': 0, 'psd_bandwidth': 0, 'psd_flatness': 0}
+        return {name: 0 for name in PSD_FEATURE_NAMES}
 
     psd_norm = psd_safe / np.sum(psd_safe)
     freqs_safe = freqs[psd > 0]
@@ -37,7 +42,7 @@ def calculate_vmd_features(iq_data: np.ndarray, fs: float) -> dict:
     """
     使用VMD分解信号，并提取每个模态的特征。
     """
-    K = 5 
+    K = VMD_K
     alpha = 2000 
     tau = 0.
     DC = 0
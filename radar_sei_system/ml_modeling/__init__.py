@@ -1,2 +1,3 @@
 # 这行代码让我们可以通过 from radar_sei_system.ml_modeling import train, predict 的方式调用
-from .main import train, predict
\ No newline at end of file
+from .main import train, predict
+from .fingerprint_library import FingerprintLibrary
@@ -0,0 +1,635 @@
+import numpy as np
+import joblib
+import os
+from typing import Union
+
+from ..feature_extraction import FeatureMatrix, as_feature_array
+
+# 指纹总数达到这个数量后，自动从精确搜索切换到分区 (IVF) 索引
+DEFAULT_IVF_THRESHOLD = 50_000
+# 分区索引查询时至少探查的分区数
+DEFAULT_NPROBE = 8
+# 每次查询扫描的候选指纹数预算；分区较小时据此多探查几个分区
+DEFAULT_MAX_CANDIDATES = 8192
+# 分区数取 max(sqrt(N), N / TARGET_LIST_SIZE)，库很大时每个分区的平均大小不超过这个值
+TARGET_LIST_SIZE = 1024
+# 指纹数增长到上次训练分区时的这么多倍后，自动重新训练分区
+REBUILD_GROWTH = 2.0
+# 训练分区中心时最多使用的样本数和迭代次数
+KMEANS_MAX_SAMPLES = 100_000
+KMEANS_ITERATIONS = 10
+# 批量查询时 "每批查询数 x 候选数" 与 "每批查询数 x 辐射源数" 的上限，控制中间数组的内存
+QUERY_BATCH_BUDGET = 1 << 20
+# 运行中的均值/标准差与当前标准化参数相差超过这个倍数时，重新标准化所有指纹
+SCALER_DRIFT_FACTOR = 2.0
+
+UNKNOWN_LABEL = "unknown"
+
+
+def _grow(array: np.ndarray, n_needed: int) -> np.ndarray:
+    # 容量不够时至少翻倍，和 FeatureMatrix 的扩容策略一致
+    if n_needed <= array.shape[0]:
+        return array
+    new = np.empty((max(n_needed, 2 * array.shape[0]),) + array.shape[1:], dtype=array.dtype)
+    new[:array.shape[0]] = array
+    return new
+
+
+def _kmeans(x: np.ndarray, n_clusters: int, seed: int = 0) -> np.ndarray:
+    """简单的 Lloyd k-means，只用于训练分区中心，返回 (n_clusters, d) 的中心。"""
+    rng = np.random.default_rng(seed)
+    if x.shape[0] > KMEANS_MAX_SAMPLES:
+        x = x[rng.choice(x.shape[0], KMEANS_MAX_SAMPLES, replace=False)]
+    n_clusters = min(n_clusters, x.shape[0])
+    centroids = x[rng.choice(x.shape[0], n_clusters, replace=False)].copy()
+
+    for _ in range(KMEANS_ITERATIONS):
+        assign = _nearest_centroid(x, centroids)
+        counts = np.bincount(assign, minlength=n_clusters)
+        sums = np.zeros_like(centroids, dtype=np.float64)
+        np.add.at(sums, assign, x)
+        non_empty = counts > 0
+        centroids[non_empty] = (sums[non_empty] / counts[non_empty, None]).astype(centroids.dtype)
+        # 空分区重新随机挑一个点作为中心
+        n_empty = int(np.sum(~non_empty))
+        if n_empty:
+            centroids[~non_empty] = x[rng.choice(x.shape[0], n_empty, replace=False)]
+
+    return centroids
+
+
+def _nearest_centroid(x: np.ndarray, centroids: np.ndarray, batch: int = 65536) -> np.ndarray:
+    c_sq = np.sum(centroids.astype(np.float64) ** 2, axis=1)
+    out = np.empty(x.shape[0], dtype=np.int64)
+    for i in range(0, x.shape[0], batch):
+        xb = x[i:i + batch]
+        # |x - c|^2 = |x|^2 - 2 x.c + |c|^2，|x|^2 对 argmin 没有影响
+        out[i:i + batch] = np.argmin(c_sq[None, :] - 2.0 * (xb @ centroids.T), axis=1)
+    return out
+
+
+class FingerprintLibrary:
+    """
+    辐射源指纹库：按辐射源保存特征向量，并在其上建立最近邻索引，用于开集识别。
+
+    - 特征按标准化后的欧氏距离比较。标准化参数可以由调用方给定 (feature_mean / feature_std)；
+      否则由库内数据的运行均值/标准差估计，估计值明显变化时自动重新标准化所有指纹。
+    - 指纹数较少时用精确的暴力搜索；超过 ivf_threshold 后训练 k-means 分区 (IVF)，
+      查询时只搜索离查询点最近的若干个分区。
+    - 新增辐射源/指纹时直接追加到对应分区；指纹数比上次训练时翻倍后自动重新训练分区，
+      使每次查询扫描的候选数不随库的增长而线性增加。
+    - 查询返回距离最近的 k 个辐射源 (每个辐射源取其所有候选指纹中的最小距离)；
+      最近距离超过 reject_distance 时判为未知辐射源。
+    """
+
+    def __init__(self, columns: list = None, reject_distance: float = None,
+                 ivf_threshold: int = DEFAULT_IVF_THRESHOLD, nprobe: int = DEFAULT_NPROBE,
+                 max_candidates: int = DEFAULT_MAX_CANDIDATES,
+                 feature_mean: np.ndarray = None, feature_std: np.ndarray = None):
+        self.columns = list(columns) if columns is not None else None
+        self.reject_distance = reject_distance
+        self.ivf_threshold = ivf_threshold
+        self.nprobe = nprobe
+        self.max_candidates = max_candidates
+
+        # 辐射源名 <-> 整数编号
+        self.emitter_names = []
+        self._emitter_index = {}
+
+        # 当前使用的标准化参数；调用方给定时固定不变
+        self._scaler_fixed = feature_mean is not None and feature_std is not None
+        self._mean = None
+        self._std = None
+        self._degenerate = None
+        if self._scaler_fixed:
+            self._mean = np.asarray(feature_mean, dtype=np.float64)
+            std = np.asarray(feature_std, dtype=np.float64).copy()
+            self._degenerate = std < 1e-12
+            std[self._degenerate] = 1.0
+            self._std = std
+
+        # 运行统计量：以第一批数据的均值为偏移量累加，避免大数值 (Hz) 相减时丢失精度
+        self._shift = None
+        self._count = 0
+        self._sum = None
+        self._sumsq = None
+
+        # 所有指纹 (标准化后, float32) 及其辐射源编号、平方范数
+        self._n = 0
+        self._vectors = None
+        self._ids = np.empty(0, dtype=np.int64)
+        self._sq_norms = np.empty(0, dtype=np.float32)
+
+        # IVF 分区：中心，以及每个分区的行号、辐射源编号、向量、平方范数 (可增长数组) 和实际长度
+        self._clear_partitions()
+
+        # calibrate_threshold 的参数；重新标准化后据此自动重新估计门限
+        self._calibration = None
+
+    def __len__(self) -> int:
+        return self._n
+
+    def __repr__(self) -> str:
+        index = "ivf" if self.is_partitioned else "exact"
+        return f"FingerprintLibrary(emitters={self.n_emitters}, fingerprints={self._n}, index={index})"
+
+    @property
+    def n_emitters(self) -> int:
+        return len(self.emitter_names)
+
+    @property
+    def is_partitioned(self) -> bool:
+        return self._centroids is not None
+
+    # ------------------------------------------------------------------
+    # 标准化
+    # ------------------------------------------------------------------
+    def _update_scaler_stats(self, x: np.ndarray):
+        if self._shift is None:
+            self._shift = x.mean(axis=0)
+            self._sum = np.zeros(x.shape[1])
+            self._sumsq = np.zeros(x.shape[1])
+        centered = x - self._shift
+        self._count += x.shape[0]
+        self._sum += centered.sum(axis=0)
+        self._sumsq += (centered ** 2).sum(axis=0)
+
+    def _running_scaler(self) -> tuple:
+        offset = self._sum / self._count
+        std = np.sqrt(np.maximum(self._sumsq / self._count - offset ** 2, 0.0))
+        mean = self._shift + offset
+        # 只有一个样本或某一维恒定时，这一维暂时不做缩放
+        degenerate = std < 1e-12 * np.maximum(1.0, np.abs(mean))
+        return mean, np.where(degenerate, 1.0, std), degenerate
+
+    def _scaler_drifted(self, mean: np.ndarray, std: np.ndarray, degenerate: np.ndarray) -> bool:
+        if np.any(self._degenerate & ~degenerate):
+            return True
+        live = ~degenerate & ~self._degenerate
+        ratio = std[live] / self._std[live]
+        shift = np.abs(mean[live] - self._mean[live]) / self._std[live]
+        return bool(np.any(ratio > SCALER_DRIFT_FACTOR) or np.any(ratio < 1.0 / SCALER_DRIFT_FACTOR)
+                    or np.any(shift > 1.0))
+
+    def _renormalize(self, mean: np.ndarray, std: np.ndarray, degenerate: np.ndarray):
+        """换用新的标准化参数，并把已有指纹换算到新的尺度下。分区需要由调用方重新训练。"""
+        batch = 1 << 20
+        for i in range(0, self._n, batch):
+            v = self._vectors[i:min(i + batch, self._n)]
+            raw = v.astype(np.float64) * self._std + self._mean
+            v[:] = ((raw - mean) / std).astype(np.float32)
+            self._sq_norms[i:i + v.shape[0]] = np.sum(v.astype(np.float64) ** 2, axis=1)
+        self._mean, self._std, self._degenerate = mean, std, degenerate
+
+    def _normalize(self, x: np.ndarray) -> np.ndarray:
+        return ((x - self._mean) / self._std).astype(np.float32)
+
+    def _after_renormalize(self):
+        # 距离的尺度变了：分区要重新训练，门限要重新估计
+        if self.is_partitioned:
+            self._train_partitions()
+        if self._calibration is not None:
+            self.calibrate_threshold(*self._calibration)
+        elif self.reject_distance is not None:
+            print("警告：特征已重新标准化，reject_distance 的尺度随之改变，请重新设置或调用 calibrate_threshold()。")
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+    def _check_columns(self, features):
+        if not isinstance(features, FeatureMatrix):
+            return
+        if self.columns is None:
+            self.columns = list(features.columns)
+        elif features.columns != self.columns:
+            raise ValueError(f"特征列不一致：指纹库为 {self.columns}，输入为 {features.columns}")
+
+    def _emitter_id(self, label) -> int:
+        emitter_id = self._emitter_index.get(label)
+        if emitter_id is None:
+            emitter_id = len(self.emitter_names)
+            self.emitter_names.append(label)
+            self._emitter_index[label] = emitter_id
+        return emitter_id
+
+    def add(self, features: Union[FeatureMatrix, np.ndarray], labels: list = None):
+        """
+        加入一批指纹。labels 为每行对应的辐射源名；为 None 时使用 FeatureMatrix 自带的标签。
+        未见过的辐射源会自动登记。已建好的分区不会因为单次插入而重建，
+        只有指纹数翻倍或标准化参数明显变化时才会自动重新训练。
+        """
+        self._check_columns(features)
+        if labels is None and isinstance(features, FeatureMatrix):
+            labels = features.labels.tolist()
+
+        x = as_feature_array(features)
+        if labels is None or len(labels) != x.shape[0]:
+            raise ValueError("每个指纹都必须有对应的辐射源标签")
+        if x.shape[0] == 0:
+            return
+
+        if self._vectors is None:
+            self._vectors = np.empty((0, x.shape[1]), dtype=np.float32)
+        if x.shape[1] != self._vectors.shape[1] or (self._mean is not None and x.shape[1] != self._mean.size):
+            raise ValueError(f"特征维度不一致：指纹库为 {self._vectors.shape[1]}，输入为 {x.shape[1]}")
+
+        renormalized = False
+        if not self._scaler_fixed:
+            self._update_scaler_stats(x)
+            mean, std, degenerate = self._running_scaler()
+            if self._mean is None:
+                self._mean, self._std, self._degenerate = mean, std, degenerate
+                if degenerate.any():
+                    print(f"警告：第一批指纹 ({x.shape[0]} 个) 无法估计全部维度的标准差，"
+                          "这些维度暂不缩放；数据足够后会自动重新标准化。"
+                          "也可以在创建指纹库时传入 feature_mean / feature_std。")
+            elif self._scaler_drifted(mean, std, degenerate):
+                self._renormalize(mean, std, degenerate)
+                renormalized = True
+
+        vectors = self._normalize(x)
+        ids = np.array([self._emitter_id(label) for label in labels], dtype=np.int64)
+
+        n_old, n_new = self._n, x.shape[0]
+        self._vectors = _grow(self._vectors, n_old + n_new)
+        self._ids = _grow(self._ids, n_old + n_new)
+        self._sq_norms = _grow(self._sq_norms, n_old + n_new)
+        self._vectors[n_old:n_old + n_new] = vectors
+        self._ids[n_old:n_old + n_new] = ids
+        self._sq_norms[n_old:n_old + n_new] = np.sum(vectors.astype(np.float64) ** 2, axis=1)
+        self._n += n_new
+
+        if renormalized:
+            self._after_renormalize()
+        elif self.is_partitioned:
+            if self._n >= REBUILD_GROWTH * self._n_at_build:
+                self._train_partitions()
+            else:
+                self._assign_to_lists(np.arange(n_old, n_old + n_new))
+        # 重新标准化只会重训已有的分区，同一批插入跨过 ivf_threshold 时也要在这里建立分区
+        if not self.is_partitioned and self._n >= self.ivf_threshold:
+            self._train_partitions()
+
+    def build_index(self, nlist: int = None):
+        """
+        按当前的运行统计量重新标准化，并 (重新) 训练分区中心、把所有指纹分配到各分区。
+        指纹数低于 ivf_threshold 且未指定 nlist 时退回精确搜索。
+        """
+        if self._n == 0:
+            print("错误：指纹库为空，无法建立索引。")
+            return
+        if not self._scaler_fixed and self._count:
+            mean, std, degenerate = self._running_scaler()
+            if not (np.allclose(mean, self._mean) and np.allclose(std, self._std)):
+                self._renormalize(mean, std, degenerate)
+                if self._calibration is not None:
+                    self.calibrate_threshold(*self._calibration)
+
+        if nlist is None and self._n < self.ivf_threshold:
+            self._clear_partitions()
+            return
+        self._train_partitions(nlist)
+
+    def _train_partitions(self, nlist: int = None):
+        if nlist is None:
+            # sqrt(N) 是常用的经验值；库很大时再限制每个分区的平均大小
+            nlist = int(max(np.sqrt(self._n), self._n / TARGET_LIST_SIZE))
+        nlist = max(1, min(int(nlist), self._n))
+
+        print(f"正在为 {self._n} 个指纹训练 {nlist} 个分区...")
+        self._centroids = _kmeans(self._vectors[:self._n], nlist)
+        n_lists, d = self._centroids.shape
+        self._list_rows = [np.empty(0, dtype=np.int64) for _ in range(n_lists)]
+        self._list_ids = [np.empty(0, dtype=np.int64) for _ in range(n_lists)]
+        self._list_vectors = [np.empty((0, d), dtype=np.float32) for _ in range(n_lists)]
+        self._list_sq = [np.empty(0, dtype=np.float32) for _ in range(n_lists)]
+        self._list_sizes = np.zeros(n_lists, dtype=np.int64)
+        self._assign_to_lists(np.arange(self._n))
+        self._n_at_build = self._n
+
+    def _clear_partitions(self):
+        self._centroids = None
+        self._list_rows, self._list_ids, self._list_vectors, self._list_sq = [], [], [], []
+        self._list_sizes = None
+        self._n_at_build = 0
+
+    def _assign_to_lists(self, rows: np.ndarray):
+        # 每个分区保存自己那部分指纹的连续副本，查询时按分区顺序读取，没有随机访问
+        assign = _nearest_centroid(self._vectors[rows], self._centroids)
+        order = np.argsort(assign, kind="stable")
+        rows, assign = rows[order], assign[order]
+        lists, starts = np.unique(assign, return_index=True)
+        ends = np.append(starts[1:], rows.size)
+        for c, s, e in zip(lists, starts, ends):
+            size, new = self._list_sizes[c], rows[s:e]
+            end = size + new.size
+            self._list_rows[c] = _grow(self._list_rows[c], end)
+            self._list_ids[c] = _grow(self._list_ids[c], end)
+            self._list_vectors[c] = _grow(self._list_vectors[c], end)
+            self._list_sq[c] = _grow(self._list_sq[c], end)
+            self._list_rows[c][size:end] = new
+            self._list_ids[c][size:end] = self._ids[new]
+            self._list_vectors[c][size:end] = self._vectors[new]
+            self._list_sq[c][size:end] = self._sq_norms[new]
+            self._list_sizes[c] = end
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+    def _effective_nprobe(self) -> int:
+        # 分区越小探查越多，但扫描的候选总数不超过 max(max_candidates, nprobe * 平均分区大小)
+        nlist = self._centroids.shape[0]
+        mean_list_size = max(self._n / nlist, 1.0)
+        return int(min(nlist, max(self.nprobe, self.max_candidates // mean_list_size)))
+
+    def _probe(self, qn: np.ndarray) -> np.ndarray:
+        """每个查询最近的若干个分区，(Q, nprobe)。"""
+        nprobe = self._effective_nprobe()
+        c_sq = np.sum(self._centroids.astype(np.float64) ** 2, axis=1)
+        c_dist = c_sq[None, :] - 2.0 * (qn @ self._centroids.T)
+        if nprobe >= c_dist.shape[1]:
+            return np.broadcast_to(np.arange(c_dist.shape[1]), c_dist.shape)
+        return np.argpartition(c_dist, nprobe - 1, axis=1)[:, :nprobe]
+
+    def _probe_candidates(self, qb: np.ndarray, probes: np.ndarray, m: int) -> tuple:
+        """
+        在探查的分区里为每个查询取候选指纹：每个 (查询, 分区) 只保留最近的 m 个，
+        合并后的前 m 个与在所有候选里直接取前 m 个完全相同。
+
+        Returns:
+            (np.ndarray, np.ndarray): (nb, nprobe * m) 的排序键 (|x|^2 - 2 x.q) 和全局行号，空位为 inf / -1。
+        """
+        nb, n_probe = probes.shape
+        keys = np.full((nb, n_probe * m), np.inf, dtype=np.float32)
+        rows = np.full((nb, n_probe * m), -1, dtype=np.int64)
+
+        # 按分区分组：同一个分区的所有查询用一次矩阵乘法算完
+        pair_list = probes.ravel()
+        pair_query = np.repeat(np.arange(nb), n_probe)
+        pair_slot = np.tile(np.arange(n_probe), nb)
+        order = np.argsort(pair_list, kind="stable")
+        lists, starts = np.unique(pair_list[order], return_index=True)
+        ends = np.append(starts[1:], order.size)
+
+        for c, s, e in zip(lists, starts, ends):
+            size = self._list_sizes[c]
+            if size == 0:
+                continue
+            sel = order[s:e]
+            qi, slot = pair_query[sel], pair_slot[sel]
+            d = self._list_sq[c][:size][None, :] - 2.0 * (qb[qi] @ self._list_vectors[c][:size].T)
+            mm = min(m, size)
+            if mm < size:
+                part = np.argpartition(d, mm - 1, axis=1)[:, :mm]
+            else:
+                part = np.broadcast_to(np.arange(size), (qi.size, size))
+            cols = slot[:, None] * m + np.arange(mm)[None, :]
+            keys[qi[:, None], cols] = np.take_along_axis(d, part, axis=1)
+            rows[qi[:, None], cols] = self._list_rows[c][part]
+
+        return keys, rows
+
+    def _top_emitters(self, keys: np.ndarray, rows: np.ndarray, k: int, m: int) -> tuple:
+        """
+        在每个查询最近的 m 个候选指纹里，按距离顺序取前 k 个不同的辐射源。
+
+        Returns:
+            (np.ndarray, np.ndarray, np.ndarray): (nb, k) 的辐射源编号、对应的最近指纹行号 (空位 -1)，
+            以及每个查询找到的辐射源数。
+        """
+        nb, n_cand = keys.shape
+        mm = min(m, n_cand)
+        if mm < n_cand:
+            part = np.argpartition(keys, mm - 1, axis=1)[:, :mm]
+        else:
+            part = np.broadcast_to(np.arange(n_cand), (nb, n_cand))
+        key = np.take_along_axis(keys, part, axis=1)
+        order = np.argsort(key, axis=1)
+        key = np.take_along_axis(key, order, axis=1)
+        row = np.take_along_axis(np.take_along_axis(rows, part, axis=1), order, axis=1)
+        ids = np.where(row >= 0, self._ids[np.maximum(row, 0)], -1)
+
+        # 每行中每个辐射源第一次出现 (即距离最近) 的位置
+        by_id = np.argsort(ids, axis=1, kind="stable")
+        ids_sorted = np.take_along_axis(ids, by_id, axis=1)
+        first_sorted = np.ones_like(ids_sorted, dtype=bool)
+        first_sorted[:, 1:] = ids_sorted[:, 1:] != ids_sorted[:, :-1]
+        first = np.empty_like(first_sorted)
+        np.put_along_axis(first, by_id, first_sorted, axis=1)
+        first &= np.isfinite(key) & (ids >= 0)
+
+        rank = np.cumsum(first, axis=1)
+        r, col = np.nonzero(first & (rank <= k))
+        top_ids = np.full((nb, k), -1, dtype=np.int64)
+        top_rows = np.full((nb, k), -1, dtype=np.int64)
+        top_ids[r, rank[r, col] - 1] = ids[r, col]
+        top_rows[r, rank[r, col] - 1] = row[r, col]
+        return top_ids, top_rows, first.sum(axis=1)
+
+    def _exact_top_emitters(self, q: np.ndarray, probe: np.ndarray, k: int) -> tuple:
+        # 前 m 个候选里不足 k 个辐射源时 (某些辐射源的指纹特别密集)，对全部候选按辐射源取最小距离
+        if probe is None:
+            vectors, ids = self._vectors[:self._n], self._ids[:self._n]
+        else:
+            vectors = np.concatenate([self._list_vectors[c][:self._list_sizes[c]] for c in probe])
+            ids = np.concatenate([self._list_ids[c][:self._list_sizes[c]] for c in probe])
+        diff = vectors.astype(np.float64) - q
+        d2 = np.einsum('ij,ij->i', diff, diff)
+        emitters, inverse = np.unique(ids, return_inverse=True)
+        best = np.full(emitters.size, np.inf)
+        np.minimum.at(best, inverse, d2)
+        order = np.argsort(best)[:k]
+        top_ids = np.full(k, -1, dtype=np.int64)
+        top_dist = np.full(k, np.inf)
+        top_ids[:order.size] = emitters[order]
+        top_dist[:order.size] = np.sqrt(best[order])
+        return top_ids, top_dist
+
+    def _search_one(self, q: np.ndarray, k: int, m: int) -> tuple:
+        """
+        单个查询的快速路径：把探查分区的候选直接拼成一维数组处理，
+        省掉批量路径里按分区分组、二维索引等对单个查询来说占大头的固定开销。
+        结果与批量路径相同。
+        """
+        if self.is_partitioned:
+            probe = self._probe(q[None, :])[0]
+            sizes = self._list_sizes[probe]
+            probe = probe[sizes > 0]
+            sizes = sizes[sizes > 0]
+            keys = np.concatenate([self._list_sq[c][:size] - 2.0 * (self._list_vectors[c][:size] @ q)
+                                   for c, size in zip(probe, sizes)])
+            ids = np.concatenate([self._list_ids[c][:size] for c, size in zip(probe, sizes)])
+            rows = np.concatenate([self._list_rows[c][:size] for c, size in zip(probe, sizes)])
+        else:
+            keys = self._sq_norms[:self._n] - 2.0 * (self._vectors[:self._n] @ q)
+            ids = self._ids[:self._n]
+            rows = None
+
+        # 先在前 m 个候选里找 k 个不同的辐射源；凑不齐时对全部候选排序 (即精确的按辐射源取最小)
+        while True:
+            mm = min(m, keys.size)
+            top = np.argpartition(keys, mm - 1)[:mm] if mm < keys.size else np.arange(keys.size)
+            top = top[np.argsort(keys[top])]
+            _, first = np.unique(ids[top], return_index=True)
+            first = np.sort(first)[:k]
+            if first.size == k or mm == keys.size:
+                break
+            m = keys.size
+
+        top = top[first]
+        top_rows = top if rows is None else rows[top]
+        diff = self._vectors[top_rows].astype(np.float64) - q
+        out_ids = np.full(k, -1, dtype=np.int64)
+        out_dist = np.full(k, np.inf)
+        out_ids[:top.size] = ids[top]
+        out_dist[:top.size] = np.sqrt(np.einsum('ij,ij->i', diff, diff))
+        return out_ids, out_dist
+
+    def _search(self, qn: np.ndarray, k: int) -> tuple:
+        """
+        批量查询已标准化的向量，每个辐射源的距离取其候选指纹中的最小值。
+
+        Returns:
+            (np.ndarray, np.ndarray): (Q, k) 的辐射源编号和距离，按距离升序；
+            候选中不足 k 个辐射源时，多出的位置编号为 -1、距离为 inf。
+        """
+        n = self._n
+        k = min(k, self.n_emitters)
+        # 每个辐射源平均有 n / n_emitters 个指纹，候选数按此放大，通常就能凑齐 k 个不同的辐射源；
+        # 上限为 max_candidates，凑不齐的少数查询由下面的精确处理兜底
+        m = max(4 * k, 32, min(2 * k * int(np.ceil(n / self.n_emitters)), self.max_candidates))
+        n_queries = qn.shape[0]
+        if n_queries == 1:
+            out_ids, out_dist = self._search_one(qn[0], k, m)
+            return out_ids[None, :], out_dist[None, :]
+        out_ids = np.full((n_queries, k), -1, dtype=np.int64)
+        out_dist = np.full((n_queries, k), np.inf)
+
+        probes = self._probe(qn) if self.is_partitioned else None
+        per_query = probes.shape[1] * m if probes is not None else n
+        batch = max(1, QUERY_BATCH_BUDGET // per_query)
+
+        for b0 in range(0, n_queries, batch):
+            qb = qn[b0:b0 + batch]
+            nb = qb.shape[0]
+
+            # 排序键 |x|^2 - 2 x.q 与平方距离只差一个常数 |q|^2，最终距离在下面用 float64 重新计算
+            if probes is not None:
+                keys, rows = self._probe_candidates(qb, probes[b0:b0 + nb], m)
+                n_total = self._list_sizes[probes[b0:b0 + nb]].sum(axis=1)
+            else:
+                keys = self._sq_norms[None, :n] - 2.0 * (qb @ self._vectors[:n].T)
+                rows = np.broadcast_to(np.arange(n), keys.shape)
+                n_total = np.full(nb, n)
+
+            top_ids, top_rows, n_found = self._top_emitters(keys, rows, k, m)
+            found = top_rows >= 0
+            diff = self._vectors[np.maximum(top_rows, 0)].astype(np.float64) - qb[:, None, :]
+            dist = np.sqrt(np.einsum('ijk,ijk->ij', diff, diff))
+            out_ids[b0:b0 + nb] = top_ids
+            out_dist[b0:b0 + nb] = np.where(found, dist, np.inf)
+
+            # 少数查询在前 m 个候选里凑不齐 k 个辐射源，而候选总数又多于 m，单独精确处理
+            for i in np.flatnonzero((n_found < k) & (n_total > m)):
+                probe = probes[b0 + i] if probes is not None else None
+                out_ids[b0 + i], out_dist[b0 + i] = self._exact_top_emitters(qb[i], probe, k)
+
+        return out_ids, out_dist
+
+    def query(self, features: Union[FeatureMatrix, np.ndarray], k: int = 5) -> list:
+        """
+        对每个待识别的指纹返回最近的 k 个辐射源，并做未知辐射源拒识。
+
+        Args:
+            features (FeatureMatrix | np.ndarray): 待识别的特征，每行一个指纹。
+            k (int): 返回的候选辐射源个数，至少为 1。
+
+        Returns:
+            list[PredictionObject]: 每个元素形如
+                {"predicted_label": 辐射源名或 "unknown", "is_unknown": bool,
+                 "distance": 最近距离, "candidates": [{"label", "distance"}, ...]}
+        """
+        if int(k) < 1:
+            raise ValueError(f"k 必须至少为 1，实际为 {k}")
+        if self._n == 0:
+            print("错误：指纹库为空。")
+            return []
+        self._check_columns(features)
+        x = as_feature_array(features)
+
+        ids, dists = self._search(self._normalize(x), int(k))
+        best = dists[:, 0]
+        is_unknown = ids[:, 0] < 0
+        if self.reject_distance is not None:
+            is_unknown |= best > self.reject_distance
+
+        results = []
+        for row_ids, row_dists, unknown, d in zip(ids.tolist(), dists.tolist(), is_unknown.tolist(), best.tolist()):
+            candidates = [{"label": self.emitter_names[i], "distance": dist}
+                          for i, dist in zip(row_ids, row_dists) if i >= 0]
+            results.append({
+                "predicted_label": UNKNOWN_LABEL if unknown else candidates[0]["label"],
+                "is_unknown": unknown,
+                "distance": d,
+                "candidates": candidates,
+            })
+        return results
+
+    def calibrate_threshold(self, quantile: float = 0.99, max_samples: int = 2000, seed: int = 0) -> float:
+        """
+        用库内数据估计拒识门限：对抽样的指纹计算 "到同一辐射源其他指纹的最近距离"，
+        取其 quantile 分位数作为 reject_distance。之后若特征被重新标准化，会用同样的参数自动重新估计。
+        """
+        if self._n < 2:
+            print("错误：指纹太少，无法估计拒识门限。")
+            return None
+
+        rng = np.random.default_rng(seed)
+        rows = np.arange(self._n)
+        if self._n > max_samples:
+            rows = rng.choice(self._n, max_samples, replace=False)
+
+        # 按辐射源编号排序一次，之后每个辐射源的指纹是一段连续的行
+        ids = self._ids[:self._n]
+        order = np.argsort(ids, kind="stable")
+        starts = np.searchsorted(ids[order], np.arange(self.n_emitters))
+        ends = np.append(starts[1:], self._n)
+
+        same_emitter = []
+        for r in rows:
+            members = order[starts[ids[r]]:ends[ids[r]]]
+            members = members[members != r]
+            if members.size == 0:
+                continue
+            diff = self._vectors[members] - self._vectors[r]
+            same_emitter.append(float(np.sqrt(np.min(np.sum(diff * diff, axis=1)))))
+        if not same_emitter:
+            print("错误：每个辐射源都只有一个指纹，无法估计拒识门限。")
+            return None
+
+        self._calibration = (quantile, max_samples, seed)
+        self.reject_distance = float(np.quantile(same_emitter, quantile))
+        return self.reject_distance
+
+    # ------------------------------------------------------------------
+    # 保存 / 加载
+    # ------------------------------------------------------------------
+    def save(self, path: str) -> str:
+        """保存到磁盘 (与模型一样使用 joblib)。"""
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        joblib.dump(self, path)
+        return path
+
+    @staticmethod
+    def load(path: str) -> "FingerprintLibrary":
+        """从磁盘加载指纹库；文件不存在或损坏时返回 None。"""
+        if not os.path.exists(path):
+            print(f"错误：指纹库文件未找到 -> {path}")
+            return None
+        try:
+            return joblib.load(path)
+        except Exception as e:
+            print(f"指纹库加载失败：{e}")
+            return None
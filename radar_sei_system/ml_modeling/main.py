@@ -3,21 +3,23 @@ import joblib
 import os
 from sklearn.linear_model import LogisticRegression
 from sklearn.exceptions import NotFittedError
-from typing import Tuple
+from typing import Tuple, Union
+
+from ..feature_extraction import FeatureMatrix, as_feature_array
 
 # 我们需要一个地方来保存模型，我们假设这个路径在config.yaml中定义
 # 但为了快速跑通，我们先在代码里硬编码一个默认路径
 # 后面我们会从config.yaml读取
 DEFAULT_MODEL_DIR = "./saved_models"
 
-def train(features: pd.DataFrame, labels: list, model_type: str, params: dict) -> Tuple[str, dict]:
+def train(features: Union[FeatureMatrix, pd.DataFrame], labels: list, model_type: str, params: dict) -> Tuple[str, dict]:
     """
     使用给定的特征和标签训练一个指定类型的分类器。
     (MVP版本：暂时忽略model_type和params，只使用默认的逻辑回归)
 
     Args:
-        features (pd.DataFrame): 用于训练的特征 (FeatureObject)。
-        labels (list): 对应的真实标签列表。
+        features (FeatureMatrix | pd.DataFrame): 用于训练的特征 (FeatureObject)。
+        labels (list): 对应的真实标签列表。为 None 时使用 FeatureMatrix 自带的标签。
         model_type (str): 要训练的模型类型 (暂时忽略)。
         params (dict): 模型的超参数 (暂时忽略)。
 
@@ -25,6 +27,9 @@ def train(features: pd.DataFrame, labels: list, model_type: str, params: dict) -
         (str, dict): 元组，包含(保存的模型路径, 训练日志)。
     """
     print(f"--- 开始训练模型 (MVP模式：使用逻辑回归) ---")
+
+    if labels is None and isinstance(features, FeatureMatrix):
+        labels = features.labels.tolist()
     
     # 确保模型保存目录存在
     if not os.path.exists(DEFAULT_MODEL_DIR):
@@ -38,7 +43,7 @@ def train(features: pd.DataFrame, labels: list, model_type: str, params: dict) -
 
     # 2. 训练模型
     try:
-        model.fit(features, labels)
+        model.fit(as_feature_array(features), labels)
         print("模型训练完成。")
     except ValueError as e:
         print(f"训练失败：{e}")
@@ -60,12 +65,12 @@ def train(features: pd.DataFrame, labels: list, model_type: str, params: dict) -
     
     return model_save_path, train_log
 
-def predict(features: pd.DataFrame, model_path: str) -> list:
+def predict(features: Union[FeatureMatrix, pd.DataFrame], model_path: str) -> list:
     """
     使用已加载的模型对新的特征数据进行预测。
 
     Args:
-        features (pd.DataFrame): 待预测的特征 (FeatureObject)。
+        features (FeatureMatrix | pd.DataFrame): 待预测的特征 (FeatureObject)。
         model_path (str): 已训练模型的路径。
 
     Returns:
@@ -85,8 +90,9 @@ def predict(features: pd.DataFrame, model_path: str) -> list:
         
     # 3. 执行预测
     try:
-        predicted_labels = model.predict(features)
-        predicted_probs = model.predict_proba(features)
+        X = as_feature_array(features)
+        predicted_labels = model.predict(X)
+        predicted_probs = model.predict_proba(X)
         class_names = model.classes_
     except NotFittedError:
         print("错误：模型尚未训练。")
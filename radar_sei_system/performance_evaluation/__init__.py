@@ -1,2 +1,2 @@
 # 这行代码让我们可以通过 from radar_sei_system.performance_evaluation import evaluate 的方式调用
-from .evaluation import evaluate
\ No newline at end of file
+from .evaluation import evaluate, merge_evaluations
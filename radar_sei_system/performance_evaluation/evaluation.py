@@ -56,4 +56,44 @@ def evaluate(predictions: list, true_labels: list) -> dict:
             "accuracy": 0.0,
             "confusion_matrix": None,
             "status": f"error: {e}"
-        }
\ No newline at end of file
+        }
+
+def merge_evaluations(results: list) -> dict:
+    """
+    合并多个分片各自的评估结果 (EvaluationObject)，得到与在全部数据上直接调用 evaluate 相同的指标。
+
+    混淆矩阵按 labels_in_matrix 对齐后相加，准确率由合并后的混淆矩阵重新计算。
+    状态不是 "success" 的结果会被忽略。
+
+    Args:
+        results (list[EvaluationObject]): 各分片的评估结果。
+
+    Returns:
+        dict: 合并后的标准评估对象 (EvaluationObject)。
+    """
+    valid = [r for r in results if r and r.get("status") == "success"]
+    if not valid:
+        print("评估错误：没有可合并的评估结果。")
+        return {
+            "accuracy": 0.0,
+            "confusion_matrix": None,
+            "status": "error: no results to merge"
+        }
+
+    # 所有分片标签的并集，保持与 evaluate 相同的排序方式
+    all_labels = sorted(set().union(*[r["labels_in_matrix"] for r in valid]))
+    position = {label: i for i, label in enumerate(all_labels)}
+
+    cm = np.zeros((len(all_labels), len(all_labels)), dtype=np.int64)
+    for r in valid:
+        idx = np.array([position[label] for label in r["labels_in_matrix"]])
+        cm[np.ix_(idx, idx)] += np.asarray(r["confusion_matrix"], dtype=np.int64)
+
+    total = int(cm.sum())
+    return {
+        "accuracy": float(np.trace(cm)) / total if total else 0.0,
+        "confusion_matrix": cm,
+        "status": "success",
+        "total_samples": total,
+        "labels_in_matrix": all_labels
+    }
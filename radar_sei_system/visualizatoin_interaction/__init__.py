@@ -0,0 +1,3 @@
+# 这行代码让我们可以通过 from radar_sei_system.visualizatoin_interaction import build_pyramid 的方式调用
+from .decimation import minmax_decimate, lttb_decimate
+from .pyramid import CACHE_SUFFIX, build_pyramid, get_pyramid_info, get_envelope_view, get_spectrogram_view
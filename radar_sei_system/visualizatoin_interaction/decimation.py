@@ -0,0 +1,84 @@
+import numpy as np
+
+
+def minmax_decimate(y: np.ndarray, n_buckets: int, t: np.ndarray = None) -> tuple:
+    """
+    Min-Max 抽取：把信号均分成 n_buckets 个桶，每个桶只保留最小值和最大值。
+    画成上下包络时，任何尖峰都不会因为抽取而丢失。
+
+    Args:
+        y (np.ndarray): 一维信号。
+        n_buckets (int): 输出桶的数量 (通常等于屏幕横向像素数)。
+        t (np.ndarray): 与 y 等长的时间轴。为 None 时使用样点下标。
+
+    Returns:
+        (np.ndarray, np.ndarray, np.ndarray): 元组 (每个桶起点的时间, 桶内最小值, 桶内最大值)。
+    """
+    y = np.asarray(y)
+    if t is None:
+        t = np.arange(y.size)
+
+    if y.size == 0 or n_buckets <= 0:
+        return np.empty(0), np.empty(0), np.empty(0)
+
+    # 点数本来就不多，不需要抽取
+    if y.size <= n_buckets:
+        return np.asarray(t), y.copy(), y.copy()
+
+    # 每个桶的起点下标；reduceat 一次性完成所有桶的归约，没有 Python 循环
+    edges = np.linspace(0, y.size, n_buckets + 1).astype(np.int64)[:-1]
+    edges = np.unique(edges)
+    y_min = np.minimum.reduceat(y, edges)
+    y_max = np.maximum.reduceat(y, edges)
+    return np.asarray(t)[edges], y_min, y_max
+
+
+def lttb_decimate(y: np.ndarray, n_out: int, t: np.ndarray = None) -> tuple:
+    """
+    LTTB (Largest-Triangle-Three-Buckets) 抽取：在每个桶里挑出与前后两点
+    构成三角形面积最大的那个点，输出仍是一条普通折线，视觉上最接近原始波形。
+
+    Args:
+        y (np.ndarray): 一维信号。
+        n_out (int): 输出点数 (至少为 3)。
+        t (np.ndarray): 与 y 等长的时间轴。为 None 时使用样点下标。
+
+    Returns:
+        (np.ndarray, np.ndarray): 元组 (选中点的时间, 选中点的值)。
+    """
+    y = np.asarray(y, dtype=np.float64)
+    if t is None:
+        t = np.arange(y.size, dtype=np.float64)
+    else:
+        t = np.asarray(t, dtype=np.float64)
+
+    if n_out >= y.size or n_out < 3:
+        return t.copy(), y.copy()
+
+    # 首尾两点固定保留，中间的点均分到 n_out - 2 个桶
+    edges = np.linspace(1, y.size - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = y.size - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+
+        # 下一个桶的平均点作为三角形的第三个顶点
+        next_lo = hi
+        next_hi = edges[i + 2] if i + 2 < len(edges) else y.size
+        if next_hi <= next_lo:
+            next_hi = next_lo + 1
+        avg_t = t[next_lo:next_hi].mean()
+        avg_y = y[next_lo:next_hi].mean()
+
+        # 当前桶内每个候选点与 (a, 平均点) 构成的三角形面积 (省略常数 1/2)
+        area = np.abs(
+            (t[a] - avg_t) * (y[lo:hi] - y[a])
+            - (t[a] - t[lo:hi]) * (avg_y - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+
+    return t[selected], y[selected]
@@ -0,0 +1,373 @@
+import os
+import math
+import numpy as np
+import h5py
+
+from .decimation import minmax_decimate, lttb_decimate
+
+# 与 data_management/loader.py 中的文件结构保持一致
+SIGNAL_PATH = 'IntraPulse/DATA'
+SAMPLE_RATE_PATH = 'TAG/SampleRate'
+
+# 缓存文件放在原始 .h5 文件旁边：xxx.h5 -> xxx.h5.pyramid.h5
+CACHE_SUFFIX = ".pyramid.h5"
+CACHE_VERSION = 1
+
+DEFAULT_NFFT = 256
+DEFAULT_HOP = 256
+# 最粗一层至少还剩这么多帧时就不再往上建层
+MIN_TOP_FRAMES = 512
+# 流式读取时每次读入的帧数 (每次读入 hop * READ_FRAMES 个样点)
+READ_FRAMES = 8192
+# HDF5 分块大小 (帧)，缩放/平移时只会读取覆盖当前视窗的这些块
+TILE_FRAMES = 256
+
+
+def get_cache_path(file_path: str) -> str:
+    """返回某个 .h5 文件对应的金字塔缓存路径 (与原文件同目录)。"""
+    return file_path + CACHE_SUFFIX
+
+
+def _read_sampling_rate(f: h5py.File) -> float:
+    # 与 loader.py 相同的假设：SampleRate 的单位是 MHz
+    return float(f[SAMPLE_RATE_PATH][0, 0]) * 1_000_000.0
+
+
+def _source_signature(file_path: str) -> tuple:
+    st = os.stat(file_path)
+    return int(st.st_size), int(st.st_mtime_ns)
+
+
+class _LevelStack:
+    """
+    多分辨率金字塔的流式写入器。
+
+    第 0 层的帧写入后，相邻两帧按 reduce_pair 合并成上一层的一帧，逐层向上传递。
+    每层只缓存最多一帧的"落单"数据，所以整个构建过程只需要一次顺序扫描。
+    文件末尾各层可能剩下一帧无法配对，直接丢弃 (最多少显示每层最后一帧)。
+    """
+
+    def __init__(self, group: h5py.Group, n_levels: int, frame_shape: tuple,
+                 dtype, reduce_pair, encode):
+        self.n_levels = n_levels
+        self.reduce_pair = reduce_pair
+        self.encode = encode
+        self.carry = [None] * n_levels
+        self.datasets = []
+        for level in range(n_levels):
+            ds = group.create_dataset(
+                f"level_{level}",
+                shape=(0,) + frame_shape,
+                maxshape=(None,) + frame_shape,
+                chunks=(TILE_FRAMES,) + frame_shape,
+                dtype=dtype,
+            )
+            self.datasets.append(ds)
+
+    def push(self, level: int, frames: np.ndarray):
+        if frames.shape[0] == 0:
+            return
+
+        ds = self.datasets[level]
+        n_old = ds.shape[0]
+        ds.resize(n_old + frames.shape[0], axis=0)
+        ds[n_old:] = self.encode(frames)
+
+        if level + 1 >= self.n_levels:
+            return
+
+        if self.carry[level] is not None:
+            frames = np.concatenate([self.carry[level], frames], axis=0)
+            self.carry[level] = None
+        if frames.shape[0] % 2 == 1:
+            self.carry[level] = frames[-1:]
+            frames = frames[:-1]
+
+        if frames.shape[0] > 0:
+            self.push(level + 1, self.reduce_pair(frames[0::2], frames[1::2]))
+
+
+def _reduce_spec(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    # 功率谱在线性域里取平均
+    return (a + b) * 0.5
+
+
+def _reduce_env(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    # 包络: [:, 0] 是最小值, [:, 1] 是最大值
+    return np.stack([np.minimum(a[:, 0], b[:, 0]), np.maximum(a[:, 1], b[:, 1])], axis=1)
+
+
+def _encode_db(power: np.ndarray) -> np.ndarray:
+    # 只在落盘时转成 dB (float16 足够显示用，且让缓存体积减半)
+    return (10.0 * np.log10(power + 1e-20)).astype(np.float16)
+
+
+def _count_levels(n_frames: int) -> int:
+    if n_frames <= MIN_TOP_FRAMES:
+        return 1
+    return int(math.ceil(math.log2(n_frames / MIN_TOP_FRAMES))) + 1
+
+
+def build_pyramid(file_path: str, nfft: int = DEFAULT_NFFT, hop: int = DEFAULT_HOP,
+                  force: bool = False) -> str:
+    """
+    一次流式扫描原始 .h5 文件，预计算多分辨率的时域包络和语谱图，并缓存到文件旁边。
+
+    第 0 层每 hop 个样点一帧，第 L 层每帧覆盖 hop * 2**L 个样点。
+    原始信号按块读取，内存占用与信号长度无关。
+    如果缓存已存在且与原文件 (大小、修改时间、参数) 一致，直接复用。
+
+    Args:
+        file_path (str): 原始 .h5 文件路径。
+        nfft (int): 每帧 FFT 点数。
+        hop (int): 第 0 层的帧移 (样点)。
+        force (bool): 为 True 时忽略已有缓存，强制重建。
+
+    Returns:
+        str: 缓存文件路径；失败时返回 None。
+    """
+    if not os.path.exists(file_path):
+        print(f"错误：文件不存在 -> {file_path}")
+        return None
+
+    cache_path = get_cache_path(file_path)
+    size, mtime_ns = _source_signature(file_path)
+
+    if not force and os.path.exists(cache_path):
+        try:
+            with h5py.File(cache_path, 'r') as c:
+                a = c.attrs
+                if (a.get("version") == CACHE_VERSION and a.get("source_size") == size
+                        and a.get("source_mtime_ns") == mtime_ns
+                        and a.get("nfft") == nfft and a.get("hop") == hop):
+                    return cache_path
+        except Exception as e:
+            print(f"金字塔缓存无法读取，将重新构建: {e}")
+
+    tmp_path = cache_path + ".tmp"
+    try:
+        with h5py.File(file_path, 'r') as f:
+            if SIGNAL_PATH not in f or SAMPLE_RATE_PATH not in f:
+                print(f"错误：.h5 文件结构不完整，未找到 {SIGNAL_PATH} 或 {SAMPLE_RATE_PATH}")
+                return None
+            _build_levels(f, tmp_path, nfft, hop, size, mtime_ns)
+
+        os.replace(tmp_path, cache_path)
+        return cache_path
+
+    except Exception as e:
+        print(f"构建多分辨率金字塔时发生错误: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return None
+
+
+def _build_levels(f: h5py.File, out_path: str, nfft: int, hop: int, size: int, mtime_ns: int):
+    """在 out_path 中写入语谱图和时域包络两套金字塔 (build_pyramid 的内部实现)。"""
+    with h5py.File(out_path, 'w') as c:
+        ds = f[SIGNAL_PATH]
+        n_samples = ds.shape[1]
+        fs = _read_sampling_rate(f)
+
+        n_spec_frames = max(0, (n_samples - nfft) // hop + 1)
+        n_env_frames = n_samples // hop
+        window = np.hanning(nfft).astype(np.float32)
+        # 与 welch(scaling='density') 相同的归一化
+        scale = 1.0 / (fs * float(np.sum(window ** 2)))
+
+        spec = _LevelStack(c.create_group("spectrogram"), _count_levels(n_spec_frames),
+                           (nfft // 2 + 1,), np.float16, _reduce_spec, _encode_db)
+        env = _LevelStack(c.create_group("envelope"), _count_levels(n_env_frames),
+                          (2,), np.float32, _reduce_env, lambda x: x.astype(np.float32))
+
+        spec_tail = np.empty(0, dtype=np.float32)
+        env_tail = np.empty(0, dtype=np.float32)
+        chunk = hop * READ_FRAMES
+
+        for start in range(0, n_samples, chunk):
+            block = ds[0, start:start + chunk].astype(np.float32)
+
+            # 时域包络：每 hop 个样点一个 (min, max)
+            buf = np.concatenate([env_tail, block])
+            n = buf.size // hop
+            if n > 0:
+                blocks = buf[:n * hop].reshape(n, hop)
+                env.push(0, np.stack([blocks.min(axis=1), blocks.max(axis=1)], axis=1))
+            env_tail = buf[n * hop:]
+
+            # 语谱图：帧长 nfft，帧移 hop，跨块的重叠部分留到下一轮
+            buf = np.concatenate([spec_tail, block])
+            n = (buf.size - nfft) // hop + 1 if buf.size >= nfft else 0
+            if n > 0:
+                frames = np.lib.stride_tricks.sliding_window_view(buf, nfft)[::hop][:n]
+                power = np.abs(np.fft.rfft(frames * window, axis=1)) ** 2 * scale
+                # 单边谱：除直流和奈奎斯特外能量翻倍
+                power[:, 1:-1] *= 2
+                spec.push(0, power.astype(np.float32))
+            spec_tail = buf[n * hop:]
+
+        c.attrs["version"] = CACHE_VERSION
+        c.attrs["source_size"] = size
+        c.attrs["source_mtime_ns"] = mtime_ns
+        c.attrs["nfft"] = nfft
+        c.attrs["hop"] = hop
+        c.attrs["sampling_rate"] = fs
+        c.attrs["n_samples"] = n_samples
+
+
+def get_pyramid_info(file_path: str) -> dict:
+    """
+    读取缓存中记录的信号总长度、采样率和各层信息 (不读取任何信号数据)。
+
+    Returns:
+        dict: {"n_samples", "sampling_rate", "nfft", "hop", "spectrogram_levels", "envelope_levels"}；
+              缓存不存在或损坏时返回 None。
+    """
+    cache_path = get_cache_path(file_path)
+    try:
+        with h5py.File(cache_path, 'r') as c:
+            return {
+                "n_samples": int(c.attrs["n_samples"]),
+                "sampling_rate": float(c.attrs["sampling_rate"]),
+                "nfft": int(c.attrs["nfft"]),
+                "hop": int(c.attrs["hop"]),
+                "spectrogram_levels": len(c["spectrogram"]),
+                "envelope_levels": len(c["envelope"]),
+            }
+    except Exception as e:
+        print(f"读取金字塔缓存信息失败: {e}")
+        return None
+
+
+def _pick_level(n_base: float, max_items: int, n_levels: int) -> int:
+    # 选择满足 "视窗内帧数 <= max_items" 的最精细一层
+    if n_base <= max_items:
+        return 0
+    return min(int(math.ceil(math.log2(n_base / max_items))), n_levels - 1)
+
+
+def get_envelope_view(file_path: str, start: int, stop: int, max_points: int = 2000,
+                      method: str = "minmax") -> dict:
+    """
+    读取 [start, stop) 样点范围内用于绘图的时域包络，输出点数不超过 max_points。
+
+    视窗足够窄时直接从原始文件读取这一小段再做抽取 (method 可选 'minmax' 或 'lttb')；
+    否则从金字塔中选取合适的层，只读取覆盖视窗的那些块。
+
+    Args:
+        file_path (str): 原始 .h5 文件路径 (需要已调用过 build_pyramid)。
+        start (int): 起始样点。
+        stop (int): 结束样点 (不包含)。
+        max_points (int): 输出点数上限 (通常等于图宽像素数)。
+        method (str): 原始数据级别的抽取方式，'minmax' 或 'lttb'。
+
+    Returns:
+        dict: {"time": 秒, "min": 下包络, "max": 上包络, "level": 所用层级 (-1 表示原始数据)}；
+              失败或视窗为空时返回 None。
+    """
+    cache_path = get_cache_path(file_path)
+    try:
+        with h5py.File(cache_path, 'r') as c:
+            fs = float(c.attrs["sampling_rate"])
+            hop = int(c.attrs["hop"])
+            n_samples = int(c.attrs["n_samples"])
+            start = max(0, int(start))
+            stop = min(n_samples, int(stop))
+            if stop <= start:
+                return None
+
+            span = stop - start
+
+            # 视窗很窄：读取的原始样点数不超过 max_points * hop
+            if span <= max_points * hop:
+                with h5py.File(file_path, 'r') as f:
+                    y = f[SIGNAL_PATH][0, start:stop].astype(np.float32)
+                t = (start + np.arange(span)) / fs
+                if method == "lttb":
+                    t_out, y_out = lttb_decimate(y, max_points, t)
+                    return {"time": t_out, "min": y_out, "max": y_out, "level": -1}
+                t_out, y_min, y_max = minmax_decimate(y, max_points, t)
+                return {"time": t_out, "min": y_min, "max": y_max, "level": -1}
+
+            group = c["envelope"]
+            level = _pick_level(span / hop, max_points, len(group))
+            block = hop * (2 ** level)
+            ds = group[f"level_{level}"]
+            j0 = start // block
+            j1 = min(ds.shape[0], -(-stop // block))
+            data = ds[j0:j1]
+            t = (np.arange(j0, j1) * block) / fs
+
+            # 层数封顶时帧数可能仍超过 max_points，再归约一次
+            if data.shape[0] > max_points:
+                t, y_min, _ = minmax_decimate(data[:, 0], max_points, t)
+                _, _, y_max = minmax_decimate(data[:, 1], max_points)
+                return {"time": t, "min": y_min, "max": y_max, "level": level}
+
+            return {"time": t, "min": data[:, 0], "max": data[:, 1], "level": level}
+
+    except Exception as e:
+        print(f"读取时域包络失败: {e}")
+        return None
+
+
+def get_spectrogram_view(file_path: str, start: int, stop: int, max_cols: int = 1000,
+                         max_rows: int = 256) -> dict:
+    """
+    读取 [start, stop) 样点范围内的语谱图，输出尺寸不超过 max_rows x max_cols。
+
+    从金字塔中选取帧数刚好不超过 max_cols 的最精细一层，只读取覆盖视窗的块。
+
+    Args:
+        file_path (str): 原始 .h5 文件路径 (需要已调用过 build_pyramid)。
+        start (int): 起始样点。
+        stop (int): 结束样点 (不包含)。
+        max_cols (int): 时间方向的像素上限。
+        max_rows (int): 频率方向的像素上限。
+
+    Returns:
+        dict: {"time": 秒, "freqs": Hz, "db": (频率 x 时间) 的功率谱 dB, "level": 所用层级}；
+              失败或视窗内没有完整的频谱帧时返回 None。
+    """
+    cache_path = get_cache_path(file_path)
+    try:
+        with h5py.File(cache_path, 'r') as c:
+            fs = float(c.attrs["sampling_rate"])
+            hop = int(c.attrs["hop"])
+            nfft = int(c.attrs["nfft"])
+            n_samples = int(c.attrs["n_samples"])
+            start = max(0, int(start))
+            stop = min(n_samples, int(stop))
+            if stop <= start:
+                return None
+
+            group = c["spectrogram"]
+            level = _pick_level((stop - start) / hop, max_cols, len(group))
+            block = hop * (2 ** level)
+            ds = group[f"level_{level}"]
+            j0 = start // block
+            j1 = max(j0 + 1, min(ds.shape[0], -(-stop // block)))
+            db = ds[j0:j1].astype(np.float32)
+            # 信号比一帧 (nfft) 还短时没有任何频谱帧
+            if db.size == 0:
+                return None
+            # 每帧的时间取帧中心
+            t = (np.arange(j0, j0 + db.shape[0]) * block + (block - hop + nfft) / 2) / fs
+            freqs = np.fft.rfftfreq(nfft, d=1.0 / fs)
+
+        if db.shape[0] > max_cols:
+            edges = np.linspace(0, db.shape[0], max_cols + 1).astype(np.int64)[:-1]
+            db = np.maximum.reduceat(db, edges, axis=0)
+            t = t[edges]
+
+        # 频率方向取最大值合并，窄带的强信号不会被平均掉
+        if db.shape[1] > max_rows:
+            edges = np.linspace(0, db.shape[1], max_rows + 1).astype(np.int64)[:-1]
+            db = np.maximum.reduceat(db, edges, axis=1)
+            freqs = freqs[edges]
+
+        return {"time": t, "freqs": freqs, "db": db.T, "level": level}
+
+    except Exception as e:
+        print(f"读取语谱图失败: {e}")
+        return None